@@ -1,12 +1,34 @@
 import os
+import json
+import asyncio
+import io
+import uuid
+import zipfile
 import httpx
-from datetime import datetime
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+import numpy as np
+from datetime import date, datetime
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
-from app.core.oral_disease_classifier import OralDiseaseClassifier
-from app.core.agent import run_agent
-from app.core.chat_history_db import db
+from app.core.oral_disease_classifier import (
+    OralDiseaseClassifier,
+    init_worker,
+    predict_batch_in_worker,
+)
+from app.core.batching import BatchingEngine
+from app.core.inference_executor import InferenceExecutor, InferenceQueueFull
+from app.core.agent import arun_agent, astream_agent, answer_cache, memory_store
+from app.core.chat_history_db import get_db, fetch_history
+from app.core.chat_writer import ChatHistoryWriter, ChatWriterBusy
+from app.core.http_client import SharedAsyncClient
+from app.core.stt import StreamingSTTBackend, create_stt_backend
+from app.core.availability import availability_service
+from app.core.tool import search_cache
+from app.core.startup import startup_tracker
+from app.core.prediction_cache import PredictionCache, model_file_version
 
 router = APIRouter()
 
@@ -22,41 +44,146 @@ async def chat_endpoint(req: ChatRequest):
     if not req.message.strip():
         raise HTTPException(status_code=400, detail="Message is required.")
 
-    final_response = run_agent(req.session_id, req.message)
+    final_response = await arun_agent(req.session_id, req.message)
     return {"final_response": final_response}
 
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@router.post("/chat/stream")
+async def chat_stream_endpoint(req: ChatRequest):
+    """
+    Streams the agent's progress as Server-Sent Events: `tool_start`/`tool_end`
+    while tools run, `token` for each piece of the final answer, then `done`
+    with the full response (or `error`).
+    """
+    if not req.message.strip():
+        raise HTTPException(status_code=400, detail="Message is required.")
+
+    async def event_stream():
+        try:
+            async for event in astream_agent(req.session_id, req.message):
+                yield _sse(event["event"], event["data"])
+        except Exception as e:
+            print(f"Error during chat stream: {e}")
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # ----------------- Save Chat History Endpoint ----------------- #
 class ChatMessage(BaseModel):
     session_id: str
     sender: str
     message: str
 
+class ChatMessageBatch(BaseModel):
+    messages: List[ChatMessage]
+
+# Messages are buffered briefly and stored with one insert_many per flush;
+# each request still waits until its own messages are acknowledged.
+CHAT_WRITER_RETRY_AFTER_SECONDS = os.getenv("CHAT_WRITER_RETRY_AFTER_SECONDS", "1")
+chat_writer = ChatHistoryWriter(
+    lambda: get_db().chat_history,
+    max_batch_size=int(os.getenv("CHAT_WRITER_MAX_BATCH_SIZE", "100")),
+    flush_interval_ms=float(os.getenv("CHAT_WRITER_FLUSH_INTERVAL_MS", "50")),
+    max_pending=int(os.getenv("CHAT_WRITER_MAX_PENDING", "5000")),
+    enqueue_timeout=float(os.getenv("CHAT_WRITER_ENQUEUE_TIMEOUT_SECONDS", "2")),
+)
+
+async def _write_chat_messages(messages: List[ChatMessage]) -> List[str]:
+    timestamp = datetime.utcnow()
+    docs = []
+    for chat in messages:
+        chat_dict = chat.dict()
+        chat_dict["timestamp"] = timestamp
+        docs.append(chat_dict)
+    try:
+        return await chat_writer.write(docs)
+    except ChatWriterBusy as e:
+        print(f"Chat history write rejected: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Chat history service is busy. Please retry shortly.",
+            headers={"Retry-After": CHAT_WRITER_RETRY_AFTER_SECONDS},
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Error saving chat history: {e}")
+        raise HTTPException(status_code=500, detail="Failed to save chat history")
+
 @router.post("/save_chat")
 async def save_chat_history(chat: ChatMessage):
-    print("Received chat:", chat)
-    chat_dict = chat.dict()
-    chat_dict["timestamp"] = datetime.utcnow()
-    
-    result = await db.chat_history.insert_one(chat_dict)
-    if result.inserted_id:
-        return {"message": "Chat saved successfully", "id": str(result.inserted_id)}
-    raise HTTPException(status_code=500, detail="Failed to save chat history")
+    ids = await _write_chat_messages([chat])
+    return {"message": "Chat saved successfully", "id": ids[0]}
+
+@router.post("/save_chat/bulk")
+async def save_chat_history_bulk(batch: ChatMessageBatch):
+    """Stores several messages (e.g. a user turn and the bot reply) in one call."""
+    ids = await _write_chat_messages(batch.messages)
+    return {"message": "Chats saved successfully", "ids": ids}
+
+CHAT_HISTORY_MAX_LIMIT = int(os.getenv("CHAT_HISTORY_MAX_LIMIT", "500"))
 
 @router.get("/chat_history/{session_id}")
-async def get_chat_history(session_id: str):
-    history = await db.chat_history.find({"session_id": session_id}).to_list(length=100)
-    # Convert MongoDB-specific types to JSON-serializable types
-    for doc in history:
-        doc["_id"] = str(doc["_id"])
-        if "timestamp" in doc:
-            doc["timestamp"] = str(doc["timestamp"])
-    return {"chat_history": history}
+async def get_chat_history(
+    session_id: str,
+    limit: int = Query(100, ge=1),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+):
+    """
+    Returns a page of the session's messages, oldest first. Without a cursor
+    this is the most recent `limit` messages; use the returned `before` /
+    `after` cursors to page through older or newer ones.
+    """
+    try:
+        return await fetch_history(session_id, min(limit, CHAT_HISTORY_MAX_LIMIT), before, after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# ----------------- Appointment Availability Endpoint ----------------- #
+@router.get("/availability")
+async def get_availability(start_date: date, end_date: Optional[date] = None):
+    """
+    Returns free one-hour appointment slots between start_date and end_date
+    (inclusive), computed in a single indexed query.
+    """
+    try:
+        slots = await run_in_threadpool(availability_service.free_slots, start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"free_slots": slots}
 
 # ----------------- Speech-to-Text Endpoint ----------------- #
 DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
 if not DEEPGRAM_API_KEY:
     print("WARNING: DEEPGRAM_API_KEY is not set. STT endpoint will fail if called.")
 
+# Point DEEPGRAM_API_URL at a local stub server to load-test without Deepgram
+DEEPGRAM_API_URL = os.getenv("DEEPGRAM_API_URL", "https://api.deepgram.com/v1/listen")
+TRANSCRIBE_CHUNK_SIZE = int(os.getenv("TRANSCRIBE_CHUNK_SIZE", str(64 * 1024)))
+
+# One pooled, keep-alive client for all calls to the STT provider
+stt_http_client = SharedAsyncClient(
+    max_connections=int(os.getenv("STT_HTTP_MAX_CONNECTIONS", "20")),
+    max_keepalive_connections=int(os.getenv("STT_HTTP_MAX_KEEPALIVE", "10")),
+    keepalive_expiry=float(os.getenv("STT_HTTP_KEEPALIVE_SECONDS", "30")),
+    timeout_seconds=float(os.getenv("STT_HTTP_TIMEOUT_SECONDS", "30")),
+)
+
+async def _iter_upload(file: UploadFile, first_chunk: bytes):
+    yield first_chunk
+    while True:
+        chunk = await file.read(TRANSCRIBE_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
 @router.post("/transcribe")
 async def transcribe_audio(
     file: UploadFile = File(...),
@@ -66,9 +193,9 @@ async def transcribe_audio(
     Receives an audio file (e.g. from the frontend),
     calls Deepgram for transcription, and returns the transcript.
     """
-    # Read the raw audio bytes
-    audio_bytes = await file.read()
-    if not audio_bytes:
+    # Peek at the first chunk only; the rest is streamed to Deepgram
+    first_chunk = await file.read(TRANSCRIBE_CHUNK_SIZE)
+    if not first_chunk:
         raise HTTPException(status_code=400, detail="No audio data received.")
 
     if not DEEPGRAM_API_KEY:
@@ -90,14 +217,17 @@ async def transcribe_audio(
         # Additional STT params as needed...
     }
 
-    # Make async call to Deepgram
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://api.deepgram.com/v1/listen",
+    # Make async call to Deepgram, streaming the upload as the request body
+    try:
+        response = await stt_http_client.get().post(
+            DEEPGRAM_API_URL,
             headers=headers,
             params=params,
-            content=audio_bytes  # raw audio
+            content=_iter_upload(file, first_chunk)  # raw audio
         )
+    except httpx.HTTPError as e:
+        print(f"Deepgram request failed: {e}")
+        raise HTTPException(status_code=502, detail="Could not reach the transcription service.")
 
     if response.status_code != 200:
         print("Deepgram error:", response.text)
@@ -117,30 +247,385 @@ async def transcribe_audio(
 
     return {"transcript": transcript}
 
+# ----------------- Real-time Speech-to-Text Endpoint ----------------- #
+_stt_backend: Optional[StreamingSTTBackend] = None
+
+def _get_stt_backend() -> StreamingSTTBackend:
+    # Built on first use so a missing Deepgram key only affects this endpoint
+    global _stt_backend
+    if _stt_backend is None:
+        _stt_backend = create_stt_backend()
+    return _stt_backend
+
+@router.websocket("/transcribe/ws")
+async def transcribe_stream(websocket: WebSocket, session_id: str, respond: bool = False):
+    """
+    Streams one utterance for transcription while it is being recorded.
+
+    The client sends audio chunks as binary frames and `{"type": "stop"}`
+    when done. The server pushes `{"type": "transcript", "text", "is_final"}`
+    as results arrive, then `{"type": "final", "transcript"}`. With
+    `?respond=true` the final transcript is also sent to the chat agent and
+    its answer comes back as `{"type": "response", "final_response"}`,
+    saving the client a separate /chat call.
+    """
+    await websocket.accept()
+    try:
+        stt = await _get_stt_backend().open_session()
+    except Exception as e:
+        print(f"Could not start streaming transcription: {e}")
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1011)
+        return
+
+    finals = []
+
+    async def relay_audio():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes"):
+                await stt.send(message["bytes"])
+            elif message.get("text") and json.loads(message["text"]).get("type") == "stop":
+                await stt.finish()
+                return
+
+    async def relay_transcripts():
+        async for result in stt.results():
+            if result["is_final"]:
+                finals.append(result["text"])
+            await websocket.send_json({"type": "transcript", **result})
+
+    audio_task = asyncio.create_task(relay_audio())
+    transcript_task = asyncio.create_task(relay_transcripts())
+    try:
+        done, _ = await asyncio.wait({audio_task, transcript_task}, return_when=asyncio.FIRST_COMPLETED)
+        if audio_task in done:
+            audio_task.result()
+            # Client said stop: wait for the provider to flush what's left
+            await transcript_task
+        else:
+            # Provider ended the stream on its own
+            transcript_task.result()
+            audio_task.cancel()
+
+        transcript = " ".join(finals).strip()
+        await websocket.send_json({"type": "final", "transcript": transcript})
+        if respond and transcript:
+            final_response = await arun_agent(session_id, transcript)
+            await websocket.send_json({"type": "response", "final_response": final_response})
+        await websocket.close()
+    except WebSocketDisconnect:
+        print(f"Transcription stream closed by client (session {session_id})")
+    except Exception as e:
+        print(f"Error during streaming transcription: {e}")
+        try:
+            await websocket.send_json({"type": "error", "detail": str(e)})
+            await websocket.close(code=1011)
+        except Exception:
+            pass
+    finally:
+        audio_task.cancel()
+        transcript_task.cancel()
+        await stt.close()
+
 # ----------------- CV / Image Prediction Endpoint ----------------- #
 # Initialize the CVAgent with the model path.
-model_path = os.path.join(os.path.dirname(__file__), "../models/oral_disease_model.h5")
-cv_agent = OralDiseaseClassifier(model_path)
+# MODEL_RUNTIME=tflite serves a quantized export (see training/src/export.py)
+# without loading the full Keras model.
+MODEL_RUNTIME = os.getenv("MODEL_RUNTIME", "keras").lower()
+DEFAULT_MODEL_FILES = {
+    "keras": "oral_disease_model.h5",
+    "tflite": "oral_disease_model_fp16.tflite",
+}
+model_path = os.getenv("MODEL_PATH") or os.path.join(
+    os.path.dirname(__file__), "../models", DEFAULT_MODEL_FILES.get(MODEL_RUNTIME, "oral_disease_model.h5")
+)
 
-@router.post("/predict")
-async def predict_image(file: UploadFile = File(...)):
+# Inference runs on a dedicated, bounded pool so forward passes never block
+# the event loop. INFERENCE_EXECUTOR selects "thread" (default) or "process".
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread").lower()
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "64"))
+INFERENCE_RETRY_AFTER_SECONDS = os.getenv("INFERENCE_RETRY_AFTER_SECONDS", "1")
+# Largest micro-batch; the tflite runtime allocates tensors for batch sizes up to this
+PREDICT_MAX_BATCH_SIZE = int(os.getenv("PREDICT_MAX_BATCH_SIZE", "8"))
+
+_PREDICTION_UNAVAILABLE_DETAILS = {
+    "loading": "Prediction model is still loading. Please retry shortly.",
+    "busy": "Prediction service is busy. Please retry shortly.",
+}
+
+def _prediction_unavailable(reason: str) -> HTTPException:
+    """The 503 + Retry-After answer shared by the prediction endpoints ("loading" or "busy")."""
+    return HTTPException(
+        status_code=503,
+        detail=_PREDICTION_UNAVAILABLE_DETAILS[reason],
+        headers={"Retry-After": INFERENCE_RETRY_AFTER_SECONDS},
+    )
+
+# The model itself is loaded by `load_prediction_model` from the app lifespan
+# (optionally in the background), so importing this module stays fast.
+cv_agent = None
+
+def _predict_with_loaded_model(img_batch):
+    return cv_agent.predict_batch(img_batch)
+
+if INFERENCE_EXECUTOR == "process":
+    # Each worker process loads its own model copy; the API process only decodes.
+    inference_executor = InferenceExecutor(
+        workers=INFERENCE_WORKERS,
+        max_queue_size=INFERENCE_QUEUE_SIZE,
+        kind="process",
+        initializer=init_worker,
+        initargs=(model_path, MODEL_RUNTIME, PREDICT_MAX_BATCH_SIZE),
+    )
+    predict_fn = predict_batch_in_worker
+else:
+    inference_executor = InferenceExecutor(
+        workers=INFERENCE_WORKERS,
+        max_queue_size=INFERENCE_QUEUE_SIZE,
+    )
+    predict_fn = _predict_with_loaded_model
+
+# Micro-batching engine: concurrent uploads share one forward pass.
+PREDICT_MAX_WAIT_MS = float(os.getenv("PREDICT_MAX_WAIT_MS", "10"))
+predict_engine = BatchingEngine(
+    predict_fn,
+    executor=inference_executor,
+    max_batch_size=PREDICT_MAX_BATCH_SIZE,
+    max_wait_ms=PREDICT_MAX_WAIT_MS,
+    max_queue_size=INFERENCE_QUEUE_SIZE,
+)
+
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "true").lower() == "true"
+
+async def load_prediction_model():
+    """
+    Loads the classifier and runs warmup inferences on dummy tensors, so the
+    first real upload doesn't pay for graph tracing or worker start-up.
+    Returns only once every inference worker has the model loaded.
+    """
+    global cv_agent
+    # Taken before loading, so cached results are keyed on the file that was actually read
+    version = model_file_version(model_path)
+    if INFERENCE_EXECUTOR == "process":
+        # Each worker process loads its model in the pool initializer; wait for all of them
+        await inference_executor.run_on_every_worker()
+    else:
+        cv_agent = await run_in_threadpool(
+            OralDiseaseClassifier, model_path, MODEL_RUNTIME, PREDICT_MAX_BATCH_SIZE
+        )
+    if prediction_cache is not None:
+        prediction_cache.set_model_version(version)
+    if not MODEL_WARMUP:
+        return
+    for batch_size in sorted({1, PREDICT_MAX_BATCH_SIZE}):
+        dummy = np.zeros((batch_size, 224, 224, 3), dtype=np.float32)
+        await inference_executor.run_on_every_worker(predict_fn, dummy)
+
+# Results for re-uploaded images, keyed by content hash + loaded model version
+PREDICT_CACHE_SIZE = int(os.getenv("PREDICT_CACHE_SIZE", "1024"))
+prediction_cache = PredictionCache(
+    max_size=PREDICT_CACHE_SIZE,
+    ttl_seconds=float(os.getenv("PREDICT_CACHE_TTL_SECONDS", "0")) or None,
+) if PREDICT_CACHE_SIZE > 0 else None
+
+# Set PREDICT_USE_TEMP_FILES=true to fall back to writing uploads to disk
+# before decoding (the default decodes straight from memory).
+PREDICT_USE_TEMP_FILES = os.getenv("PREDICT_USE_TEMP_FILES", "false").lower() == "true"
+
+def _load_via_temp_file(content: bytes, filename: str):
     temp_dir = "temp"
-    if not os.path.exists(temp_dir):
-        os.makedirs(temp_dir)
-    
-    file_location = os.path.join(temp_dir, file.filename)
+    os.makedirs(temp_dir, exist_ok=True)
+    # Prefix with a UUID so concurrent uploads with the same name don't collide
+    file_location = os.path.join(temp_dir, f"{uuid.uuid4().hex}_{os.path.basename(filename or 'upload')}")
     with open(file_location, "wb") as f:
-        content = await file.read()
         f.write(content)
-    print(f"File saved to: {file_location} (Size: {len(content)} bytes)")
-    
     try:
-        prediction, confidence = cv_agent.predict(file_location)
+        return OralDiseaseClassifier.load_image(file_location)
+    finally:
+        os.remove(file_location)
+
+@router.post("/predict")
+async def predict_image(file: UploadFile = File(...)):
+    if not startup_tracker.is_ready("model"):
+        raise _prediction_unavailable("loading")
+    content = await file.read()
+    print(f"Received image: {file.filename} (Size: {len(content)} bytes)")
+
+    cache_key = None
+    if prediction_cache is not None:
+        cache_key = await run_in_threadpool(prediction_cache.key_for, content)
+        cached = prediction_cache.get(cache_key)
+        if cached is not None:
+            prediction, confidence = cached
+            return {"prediction": prediction, "confidence": confidence}
+
+    try:
+        # Decoding is CPU-bound too, so keep it off the event loop
+        if PREDICT_USE_TEMP_FILES:
+            image = await run_in_threadpool(_load_via_temp_file, content, file.filename)
+        else:
+            image = await run_in_threadpool(OralDiseaseClassifier.load_image, memoryview(content))
+        prediction, confidence = await predict_engine.submit(image)
+    except InferenceQueueFull as e:
+        print(f"Prediction rejected: {e}")
+        raise _prediction_unavailable("busy")
     except Exception as e:
         # Log the error for debugging.
         print(f"Error during prediction: {e}")
         return {"error": f"Error in prediction: {str(e)}"}
-    
-    # Optionally, remove the temporary file after processing.
-    os.remove(file_location)
-    return {"prediction": prediction, "confidence": confidence}
\ No newline at end of file
+
+    if cache_key is not None:
+        prediction_cache.set(cache_key, (prediction, confidence))
+    return {"prediction": prediction, "confidence": confidence}
+
+# ----------------- Batch Image Prediction Endpoint ----------------- #
+PREDICT_BATCH_MAX_IMAGES = int(os.getenv("PREDICT_BATCH_MAX_IMAGES", "32"))
+PREDICT_BATCH_MAX_BYTES = int(os.getenv("PREDICT_BATCH_MAX_BYTES", str(100 * 1024 * 1024)))
+
+def _expand_upload(filename: str, content: bytes, max_images: int = PREDICT_BATCH_MAX_IMAGES):
+    """
+    Returns (name, bytes) pairs for an upload: the file itself, or every file
+    in it if it is a zip archive (in archive order, skipping folders and
+    macOS metadata). At most `max_images` entries are extracted.
+    """
+    if not zipfile.is_zipfile(io.BytesIO(content)):
+        return [(filename, content)]
+    entries = []
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        total_size = 0
+        for info in archive.infolist():
+            if info.is_dir() or info.filename.startswith("__MACOSX/") or os.path.basename(info.filename).startswith("."):
+                continue
+            # Checked before extracting so a zip bomb can't exhaust memory
+            total_size += info.file_size
+            if total_size > PREDICT_BATCH_MAX_BYTES:
+                raise ValueError(f"Archive '{filename}' expands to more than {PREDICT_BATCH_MAX_BYTES} bytes")
+            if len(entries) >= max_images:
+                raise ValueError(f"At most {PREDICT_BATCH_MAX_IMAGES} images can be predicted per request.")
+            entries.append((f"{filename}/{info.filename}", archive.read(info)))
+    return entries
+
+@router.post("/predict/batch")
+async def predict_images(files: List[UploadFile] = File(...)):
+    """
+    Classifies several images in one request. Accepts any mix of image files
+    and zip archives of images. Images are decoded in parallel and classified
+    in a single batched forward pass. Results come back in upload order (zip
+    entries in archive order); an image that fails only gets an `error`
+    entry, the rest of the batch still succeeds.
+    """
+    if not startup_tracker.is_ready("model"):
+        raise _prediction_unavailable("loading")
+
+    # Both limits are checked before the bytes are read, not after
+    if len(files) > PREDICT_BATCH_MAX_IMAGES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {PREDICT_BATCH_MAX_IMAGES} images can be predicted per request.",
+        )
+
+    items = []
+    remaining_bytes = PREDICT_BATCH_MAX_BYTES
+    for file in files:
+        # Read no more than what is left of the budget, plus one byte to detect overflow
+        content = await file.read(remaining_bytes + 1)
+        if len(content) > remaining_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Uploads may total at most {PREDICT_BATCH_MAX_BYTES} bytes per request.",
+            )
+        remaining_bytes -= len(content)
+        try:
+            entries = await run_in_threadpool(
+                _expand_upload, file.filename, content, PREDICT_BATCH_MAX_IMAGES - len(items)
+            )
+        except (ValueError, zipfile.BadZipFile) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        items.extend({"filename": name, "content": data} for name, data in entries)
+        if len(items) > PREDICT_BATCH_MAX_IMAGES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"At most {PREDICT_BATCH_MAX_IMAGES} images can be predicted per request.",
+            )
+    if not items:
+        raise HTTPException(status_code=400, detail="No images received.")
+    print(f"Received batch of {len(items)} images")
+
+    async def prepare(item):
+        # Cache lookup, then decode; each runs in the threadpool in parallel
+        if prediction_cache is not None:
+            item["cache_key"] = await run_in_threadpool(prediction_cache.key_for, item["content"])
+            cached = prediction_cache.get(item["cache_key"])
+            if cached is not None:
+                item["result"] = cached
+                return
+        try:
+            item["image"] = await run_in_threadpool(OralDiseaseClassifier.load_image, memoryview(item["content"]))
+        except Exception as e:
+            item["error"] = f"Error in prediction: {str(e)}"
+
+    await asyncio.gather(*[prepare(item) for item in items])
+
+    pending = [item for item in items if "image" in item]
+    if pending:
+        batch = np.stack([item["image"] for item in pending])
+        try:
+            results = await inference_executor.run(predict_fn, batch)
+        except InferenceQueueFull as e:
+            print(f"Batch prediction rejected: {e}")
+            raise _prediction_unavailable("busy")
+        except Exception as e:
+            print(f"Error during batch prediction: {e}")
+            results = None
+            for item in pending:
+                item["error"] = f"Error in prediction: {str(e)}"
+        if results is not None:
+            for item, result in zip(pending, results):
+                item["result"] = result
+                if item.get("cache_key") is not None:
+                    prediction_cache.set(item["cache_key"], result)
+
+    response = []
+    for item in items:
+        if "result" in item:
+            prediction, confidence = item["result"]
+            response.append({"filename": item["filename"], "prediction": prediction, "confidence": confidence})
+        else:
+            response.append({"filename": item["filename"], "error": item["error"]})
+    return {"results": response}
+
+# ----------------- Health Endpoints ----------------- #
+@router.get("/live")
+async def liveness():
+    """Answers as soon as the process is serving, even while models load."""
+    return {"status": "alive"}
+
+@router.get("/ready")
+async def readiness():
+    """
+    Reports each component's load state and time. Returns 503 until every
+    required component (the prediction model) is ready.
+    """
+    report = startup_tracker.report()
+    if not report["ready"]:
+        return JSONResponse(status_code=503, content=report)
+    return report
+
+# ----------------- Runtime Stats Endpoint ----------------- #
+@router.get("/stats")
+async def get_stats():
+    """Reports runtime performance counters (e.g. achieved prediction batching)."""
+    return {
+        "predict": predict_engine.stats(),
+        "prediction_cache": prediction_cache.stats() if prediction_cache is not None else None,
+        "inference_executor": inference_executor.stats(),
+        "search_cache": search_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+        "memory": await run_in_threadpool(memory_store.stats),
+        "chat_writer": chat_writer.stats(),
+        "stt_http_client": stt_http_client.stats(),
+    }
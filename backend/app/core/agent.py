@@ -1,89 +1,173 @@
+import asyncio
 import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from langchain_openai import ChatOpenAI
 from langgraph.prebuilt import create_react_agent
 
 # Tools
-from app.core.tool import QueryPostgreSQLTool, SearchTool
-from app.core.memory import WindowMemoryManager
+from app.core.tool import QueryPostgreSQLTool, SearchTool, AvailabilityTool, BookAppointmentTool
+from app.core.memory import WindowMemoryManager, create_memory_backend
+from app.core.answer_cache import SemanticAnswerCache, tool_call_names, used_only_tools
 
-# Create a single memory store for ephemeral usage
-memory_store = WindowMemoryManager(window_size=10)
+# Create a single memory store for conversation context. MEMORY_BACKEND picks
+# where it lives: "inprocess" (default) or "sqlite" (shared across workers).
+memory_store = WindowMemoryManager(window_size=10, backend=create_memory_backend())
 
-def create_agent():
+# Final answers to general (non-patient) questions, shared across sessions
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+answer_cache = SemanticAnswerCache(
+    threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.7")),
+    max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "500")),
+    ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400")),
+)
+# Answers are only cached for a session's first message, and only when the
+# agent searched the web and used nothing else
+CACHEABLE_TOOLS = {"SearchTool"}
+
+# Database schema details
+TABLE_SCHEMA = """
+The database schema is as follows:
+
+Table: patients
+ - id (serial, primary key)
+ - name (VARCHAR(100), NOT NULL)
+ - email (VARCHAR(100), UNIQUE)
+ - phone (VARCHAR(20))
+ - created_at (TIMESTAMP, defaults to CURRENT_TIMESTAMP)
+
+Table: appointments
+ - id (serial, primary key)
+ - patient_id (integer, NOT NULL, foreign key referencing patients(id))
+ - appointment_date (DATE, NOT NULL)
+ - appointment_time (TIME, NOT NULL)
+ - notes (text)
+ - created_at (TIMESTAMP, defaults to CURRENT_TIMESTAMP)
+"""
+
+# Refined system prompt (rendered once at import time):
+SYSTEM_PROMPT = f"""
+You are an AI assistant with access to four tools:
+
+1) QueryPostgreSQLTool: For running SQL queries on the PostgreSQL dental database.
+   {TABLE_SCHEMA}
+
+2) SearchTool: For answering general dental questions from the web. (e.g. cause of dental diseases, cures, tips, preventions).
+
+3) AvailabilityTool: Lists free one-hour appointment slots for a date or date range.
+
+4) BookAppointmentTool: Books an appointment, registering the patient if needed. It rejects slots that clash with existing appointments.
+
+Rules:
+- If the user's query contains or references SQL (SELECT, INSERT, UPDATE, etc.), call QueryPostgreSQLTool. After that, ask if the user wants to schedule an appointment.
+- If the user wants general dental info (causes, cures, tips, preventions), call SearchTool. Also provide URL references. After that, ask if the user wants to schedule an appointment.
+- If the question is irrelevant to dental care or the database, politely refuse to answer, stating:
+  "I only handle dental-related queries."
+- When user wants to schedule an appointment, ask for users` name, email, phone, appointment date and time, reason for appointment. Do not proceed when not complete.
+- To check or suggest open times, call AvailabilityTool instead of writing SQL. Appointments last one hour and must not overlap.
+- To schedule, call BookAppointmentTool; it registers a new patient or reuses the existing patient record by email. If it reports a conflict, offer free slots from AvailabilityTool.
+- Return only final results (query results, search results, or a polite refusal). No extra commentary.
+"""
+
+@dataclass(frozen=True)
+class AgentConfig:
+    """
+    Settings that determine how the agent is built. Two equal configs
+    produce interchangeable agents, so a change here triggers a rebuild.
+    """
+    openai_api_key: str = field(repr=False)
+    model: str = "gpt-4o-mini"
+    temperature: float = 0.0
+
+    @classmethod
+    def from_env(cls) -> "AgentConfig":
+        openai_api_key = os.getenv("OPENAI_API_KEY")
+        if not openai_api_key:
+            raise ValueError("OPENAI_API_KEY must be set")
+        return cls(
+            openai_api_key=openai_api_key,
+            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+            temperature=float(os.getenv("OPENAI_TEMPERATURE", "0")),
+        )
+
+def create_agent(config: Optional[AgentConfig] = None):
     """
     Creates a ReAct agent with ephemeral window memory in mind.
     This agent uses tools QueryPostgreSQLTool (for SQL queries)
     and SearchTool (for general dental questions), injecting schema details
     and instructions about disallowing irrelevant queries.
     """
-    openai_api_key = os.getenv("OPENAI_API_KEY")
-    if not openai_api_key:
-        raise ValueError("OPENAI_API_KEY must be set")
+    config = config or AgentConfig.from_env()
 
     llm = ChatOpenAI(
-        openai_api_key=openai_api_key,
-        model="gpt-4o-mini",
-        temperature=0
+        openai_api_key=config.openai_api_key,
+        model=config.model,
+        temperature=config.temperature
     )
 
-    # Database schema details
-    table_schema = """
-    The database schema is as follows:
+    # Tools: DB for SQL queries, SearchTool for general dental info,
+    # plus deterministic availability lookup and booking
+    tools = [QueryPostgreSQLTool(), SearchTool(), AvailabilityTool(), BookAppointmentTool()]
 
-    Table: patients
-     - id (serial, primary key)
-     - name (VARCHAR(100), NOT NULL)
-     - email (VARCHAR(100), UNIQUE)
-     - phone (VARCHAR(20))
-     - created_at (TIMESTAMP, defaults to CURRENT_TIMESTAMP)
+    agent = create_react_agent(
+        llm,
+        tools,
+        state_modifier=SYSTEM_PROMPT
+    )
+    return agent
 
-    Table: appointments
-     - id (serial, primary key)
-     - patient_id (integer, NOT NULL, foreign key referencing patients(id))
-     - appointment_date (DATE, NOT NULL)
-     - appointment_time (TIME, NOT NULL)
-     - notes (text)
-     - created_at (TIMESTAMP, defaults to CURRENT_TIMESTAMP)
+class AgentRegistry:
+    """
+    Holds one long-lived, compiled agent (and its LLM/HTTP clients) shared by
+    all requests. The compiled graph keeps no per-session state, so it is
+    safe to invoke concurrently; conversation history is passed in per call.
     """
 
-    # Refined system prompt:
-    system_prompt = f"""
-    You are an AI assistant with access to two tools:
-
-    1) QueryPostgreSQLTool: For running SQL queries on the PostgreSQL dental database.
-       {table_schema}
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._agent = None
+        self._config: Optional[AgentConfig] = None
 
-    2) SearchTool: For answering general dental questions from the web. (e.g. cause of dental diseases, cures, tips, preventions).
+    def get(self):
+        """
+        Returns the shared agent, building it on first use or rebuilding it
+        if the configuration in the environment has changed since.
+        """
+        config = AgentConfig.from_env()
+        agent = self._agent
+        if agent is not None and config == self._config:
+            return agent
+        with self._lock:
+            if self._agent is None or config != self._config:
+                self._build(config)
+            return self._agent
 
-    Rules:
-    - If the user's query contains or references SQL (SELECT, INSERT, UPDATE, etc.), call QueryPostgreSQLTool. After that, ask if the user wants to schedule an appointment.
-    - If the user wants general dental info (causes, cures, tips, preventions), call SearchTool. Also provide URL references. After that, ask if the user wants to schedule an appointment.
-    - If the question is irrelevant to dental care or the database, politely refuse to answer, stating:
-      "I only handle dental-related queries."
-    - When user wants to schedule an appointment, ask for users` name, email, phone, appointment date and time (Do not schedule if date and time is already scheduled. Only schedule when chosen date and time is 1 hour before or 1 hour after the already scheduled date and time), reason for appointment. Do not proceed when not complete.
-    - Upon scheduling an appointment, if there is no associated patient record details, register as new patient. If there is, associate the appointment with the patient record.
-    - Return only final results (query results, search results, or a polite refusal). No extra commentary.
-    """
+    def rebuild(self, config: Optional[AgentConfig] = None):
+        """Forces a rebuild, e.g. after rotating keys or switching models."""
+        with self._lock:
+            self._build(config or AgentConfig.from_env())
+            return self._agent
 
-    # Tools: DB for SQL queries, plus SearchTool for general dental info
-    tools = [QueryPostgreSQLTool(), SearchTool()]
+    def _build(self, config: AgentConfig) -> None:
+        self._agent = create_agent(config)
+        self._config = config
+        print(f"Agent built (model={config.model}, temperature={config.temperature})")
 
-    agent = create_react_agent(
-        llm,
-        tools,
-        state_modifier=system_prompt
-    )
-    return agent
+# Shared agent registry, warmed up at application startup
+agent_registry = AgentRegistry()
 
-def run_agent(session_id: str, user_message: str) -> str:
-    """
-    Runs the ReAct agent on a user message, storing context in ephemeral memory.
-    :param session_id: Unique session ID (e.g., from user or UI).
-    :param user_message: The latest user message.
-    :return: The agent's final text response.
+def _start_turn(session_id: str, user_message: str) -> Tuple[list, Optional[str]]:
     """
-    agent = create_agent()
+    Loads the session's conversation from memory, appends the new user
+    message and records it. Returns the messages to feed the agent and,
+    when the answer cache can serve this message, the cached answer (already
+    saved as the assistant's reply).
 
+    Only a session's first message is looked up: later ones ("yes go ahead",
+    "what are the treatments for that condition?") depend on the history.
+    """
     # Load conversation from memory
     conversation_history = memory_store.load_conversation(session_id)
 
@@ -99,15 +183,127 @@ def run_agent(session_id: str, user_message: str) -> str:
     past_messages.append(("human", user_message))
     memory_store.save_user_message(session_id, user_message)
 
+    cached = None
+    if ANSWER_CACHE_ENABLED and not conversation_history:
+        cached = answer_cache.lookup(user_message)
+        if cached is not None:
+            memory_store.save_assistant_message(session_id, cached)
+    return past_messages, cached
+
+def _maybe_cache_answer(
+    user_message: str, past_messages: list, tool_names: List[str], final_text: str, started_at: float
+) -> None:
+    """Stores a first-turn answer that came from web search alone."""
+    if ANSWER_CACHE_ENABLED and len(past_messages) == 1 and used_only_tools(tool_names, CACHEABLE_TOOLS):
+        answer_cache.store(user_message, final_text, time.perf_counter() - started_at)
+
+def run_agent(session_id: str, user_message: str) -> str:
+    """
+    Runs the ReAct agent on a user message, storing context in ephemeral memory.
+    :param session_id: Unique session ID (e.g., from user or UI).
+    :param user_message: The latest user message.
+    :return: The agent's final text response.
+    """
+    started_at = time.perf_counter()
+    past_messages, cached = _start_turn(session_id, user_message)
+    if cached is not None:
+        return cached
+    agent = agent_registry.get()
+
     # Now pass these messages to the agent
     response = agent.invoke({"messages": past_messages})
     final_text = response["messages"][-1].content
 
     # Save the assistant's response
     memory_store.save_assistant_message(session_id, final_text)
+    tool_names = tool_call_names(response["messages"][len(past_messages):])
+    _maybe_cache_answer(user_message, past_messages, tool_names, final_text, started_at)
 
     return final_text
 
+async def arun_agent(session_id: str, user_message: str) -> str:
+    """
+    Async variant of `run_agent`. Tool calls go through the tools' `_arun`,
+    and memory reads/writes run in worker threads, so database, search and
+    SQLite memory round trips don't block the event loop.
+    """
+    started_at = time.perf_counter()
+    past_messages, cached = await asyncio.to_thread(_start_turn, session_id, user_message)
+    if cached is not None:
+        return cached
+    agent = agent_registry.get()
+
+    response = await agent.ainvoke({"messages": past_messages})
+    final_text = response["messages"][-1].content
+
+    await asyncio.to_thread(memory_store.save_assistant_message, session_id, final_text)
+    tool_names = tool_call_names(response["messages"][len(past_messages):])
+    _maybe_cache_answer(user_message, past_messages, tool_names, final_text, started_at)
+
+    return final_text
+
+async def astream_agent(session_id: str, user_message: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming variant of `arun_agent`. Yields events as the ReAct loop runs:
+      {"event": "tool_start", "data": {"tool": ..., "input": ...}}
+      {"event": "tool_end",   "data": {"tool": ...}}
+      {"event": "token",      "data": {"text": ...}}   (final-answer tokens)
+      {"event": "done",       "data": {"final_response": ..., "cached": bool}}
+    The assistant message is saved to memory before "done". If the client
+    disconnects, the answer text streamed so far is saved instead; if the run
+    fails, nothing is saved.
+    """
+    started_at = time.perf_counter()
+    past_messages, cached = await asyncio.to_thread(_start_turn, session_id, user_message)
+    if cached is not None:
+        yield {"event": "token", "data": {"text": cached}}
+        yield {"event": "done", "data": {"final_response": cached, "cached": True}}
+        return
+    agent = agent_registry.get()
+
+    final_text = None
+    turn_tokens = []
+    tools_used = []
+    try:
+        async for event in agent.astream_events({"messages": past_messages}, version="v2"):
+            kind = event["event"]
+            if kind == "on_chat_model_start":
+                # Each LLM turn starts a fresh answer; only the last one is final
+                turn_tokens = []
+            elif kind == "on_chat_model_stream":
+                chunk = event["data"]["chunk"]
+                # Skip tool-call argument fragments; forward answer text only
+                if chunk.content and not getattr(chunk, "tool_call_chunks", None):
+                    turn_tokens.append(chunk.content)
+                    yield {"event": "token", "data": {"text": chunk.content}}
+            elif kind == "on_tool_start":
+                tools_used.append(event["name"])
+                yield {"event": "tool_start", "data": {"tool": event["name"], "input": event["data"].get("input")}}
+            elif kind == "on_tool_end":
+                yield {"event": "tool_end", "data": {"tool": event["name"]}}
+            elif kind == "on_chain_end" and not event.get("parent_ids"):
+                # End of the whole graph run: its output holds the final message
+                output = event["data"].get("output") or {}
+                if isinstance(output, dict) and output.get("messages"):
+                    final_text = output["messages"][-1].content
+    except (GeneratorExit, asyncio.CancelledError):
+        # The client went away mid-stream and the generator is being closed:
+        # keep the answer streamed so far so the user turn isn't left unanswered.
+        # Shielded so a cancelled request still finishes the write.
+        partial_text = final_text if final_text is not None else "".join(turn_tokens)
+        if partial_text:
+            await asyncio.shield(asyncio.to_thread(memory_store.save_assistant_message, session_id, partial_text))
+        raise
+
+    # A failed LLM or tool call propagated above without saving anything, so
+    # no broken answer is fed back to the model on later turns
+    if final_text is None:
+        final_text = "".join(turn_tokens)
+    await asyncio.to_thread(memory_store.save_assistant_message, session_id, final_text)
+    _maybe_cache_answer(user_message, past_messages, tools_used, final_text, started_at)
+
+    yield {"event": "done", "data": {"final_response": final_text, "cached": False}}
+
 def clear_session(session_id: str):
     """
     Clears the ephemeral conversation for a given session_id.
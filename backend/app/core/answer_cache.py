@@ -0,0 +1,184 @@
+# answer_cache.py
+import math
+import re
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict, defaultdict
+from typing import Any, Dict, Iterable, Optional, Set
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Words that carry little meaning for matching paraphrases
+_STOPWORDS = frozenset(
+    "a an the is are was were be been do does did of to in on at for and or "
+    "what how why when which who can could should would will i you it its "
+    "my your me about with from this that these those please tell".split()
+)
+
+# Questions mentioning any of these may involve patient or appointment data
+# and must always go to the agent, never to the cache.
+_SENSITIVE_RE = re.compile(
+    r"appointment|schedul|book|cancel|patient|record|e-?mail|phone|address|"
+    r"\bname\b|database|\bsql\b|\bselect\b|\binsert\b|\bupdate\b|\bdelete\b|"
+    r"\bslot|availab|\bmy (teeth|tooth|gums?|results?|diagnosis|prediction)\b|"
+    r"@|\d",
+    re.IGNORECASE,
+)
+
+
+def _stem(word: str) -> str:
+    # Light plural stripping so "causes"/"cause" or "gums"/"gum" match
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def _features(text: str) -> Counter:
+    """Hashed word unigrams/bigrams plus character trigrams of the content words."""
+    words = [_stem(w) for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS]
+    grams = list(words)
+    grams += [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        grams += [padded[i:i + 3] for i in range(len(padded) - 2)]
+    return Counter(zlib.crc32(g.encode()) for g in grams)
+
+
+class SemanticAnswerCache:
+    """
+    Serves stored final answers for questions that are paraphrases of ones
+    already answered, using a local TF-IDF index over hashed n-grams (no
+    external embedding service).
+
+    Only self-contained, general questions are eligible: anything that looks
+    like it touches patient or appointment data is bypassed on lookup, and
+    callers should only `store` answers that didn't read the database.
+
+    Entry vectors are normalized once, with the IDF weights at store time,
+    and indexed by feature so a lookup only scores entries sharing a feature
+    with the question.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.7,
+        max_entries: int = 500,
+        ttl_seconds: Optional[float] = 86400,
+        min_content_words: int = 2,
+    ):
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.min_content_words = min_content_words
+        self._lock = threading.Lock()
+        # key -> {"tf": Counter, "vec": {feature: weight}, "answer": str, "latency": float, "expires_at": float | None}
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._doc_freq: Counter = Counter()
+        # feature -> keys of the entries containing it
+        self._postings: Dict[int, Set[str]] = defaultdict(set)
+        self._lookups = 0
+        self._hits = 0
+        self._bypassed = 0
+        self._latency_saved = 0.0
+
+    def is_cacheable(self, question: str) -> bool:
+        if _SENSITIVE_RE.search(question):
+            return False
+        content_words = [w for w in _WORD_RE.findall(question.lower()) if w not in _STOPWORDS]
+        return len(content_words) >= self.min_content_words
+
+    def _vector(self, tf: Counter) -> Dict[int, float]:
+        n_docs = len(self._entries) + 1
+        vec = {
+            f: (1 + math.log(count)) * math.log((n_docs + 1) / (self._doc_freq.get(f, 0) + 1)) + 1e-9
+            for f, count in tf.items()
+        }
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        return {f: v / norm for f, v in vec.items()}
+
+    def lookup(self, question: str) -> Optional[str]:
+        """Returns a cached answer for a close-enough paraphrase, or None."""
+        if not self.is_cacheable(question):
+            self._bypassed += 1
+            return None
+        tf = _features(question)
+        now = time.time()
+        with self._lock:
+            self._lookups += 1
+            self._evict_expired(now)
+            scores: Dict[str, float] = defaultdict(float)
+            for f, w in self._vector(tf).items():
+                for key in self._postings.get(f, ()):
+                    scores[key] += w * self._entries[key]["vec"][f]
+            best_key = max(scores, key=scores.get, default=None)
+            if best_key is None or scores[best_key] < self.threshold:
+                return None
+            entry = self._entries[best_key]
+            self._entries.move_to_end(best_key)
+            self._hits += 1
+            self._latency_saved += entry["latency"]
+            return entry["answer"]
+
+    def store(self, question: str, answer: str, latency_seconds: float) -> None:
+        """Records the agent's answer and how long it took to produce."""
+        if not self.is_cacheable(question) or not answer:
+            return
+        key = " ".join(_WORD_RE.findall(question.lower()))
+        tf = _features(question)
+        with self._lock:
+            if key in self._entries:
+                self._forget(key)
+            self._doc_freq.update(tf.keys())
+            self._entries[key] = {
+                "tf": tf,
+                "vec": self._vector(tf),
+                "answer": answer,
+                "latency": latency_seconds,
+                "expires_at": time.time() + self.ttl_seconds if self.ttl_seconds else None,
+            }
+            for f in tf:
+                self._postings[f].add(key)
+            while len(self._entries) > self.max_entries:
+                self._forget(next(iter(self._entries)))
+
+    def _forget(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._doc_freq.subtract(entry["tf"].keys())
+        self._doc_freq += Counter()  # drop zero counts
+        for f in entry["tf"]:
+            keys = self._postings[f]
+            keys.discard(key)
+            if not keys:
+                del self._postings[f]
+
+    def _evict_expired(self, now: float) -> None:
+        expired = [k for k, e in self._entries.items() if e["expires_at"] is not None and e["expires_at"] <= now]
+        for key in expired:
+            self._forget(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "threshold": self.threshold,
+            "lookups": self._lookups,
+            "hits": self._hits,
+            "hit_rate": round(self._hits / self._lookups, 4) if self._lookups else 0.0,
+            "bypassed": self._bypassed,
+            "latency_saved_seconds": round(self._latency_saved, 3),
+        }
+
+
+def used_only_tools(tool_names: Iterable[str], allowed: Iterable[str]) -> bool:
+    """
+    True if at least one tool was called and every call was to one of the
+    `allowed` tools. Answers given without any tool call (small talk,
+    follow-up prompts such as booking questions) are not worth caching.
+    """
+    tool_names = list(tool_names)
+    return bool(tool_names) and set(tool_names) <= set(allowed)
+
+
+def tool_call_names(messages: Iterable[Any]) -> list:
+    """Names of the tools called in a run's new messages."""
+    return [call.get("name") for msg in messages for call in getattr(msg, "tool_calls", None) or []]
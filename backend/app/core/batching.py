@@ -0,0 +1,168 @@
+# batching.py
+import asyncio
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.core.inference_executor import InferenceExecutor, InferenceQueueFull
+
+
+class BatchingEngine:
+    """
+    Collects concurrent prediction requests into micro-batches so that one
+    model forward pass serves many callers.
+
+    A batch is dispatched as soon as it holds `max_batch_size` items, or
+    `max_wait_ms` after its first item was picked up, whichever comes first.
+    Each caller awaits its own future and receives its own result.
+
+    Forward passes run on `executor` (one in-flight batch per executor
+    worker). When `max_queue_size` requests are already waiting, `submit`
+    raises InferenceQueueFull instead of queueing more.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[np.ndarray], List[Any]],
+        executor: Optional[InferenceExecutor] = None,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        max_queue_size: int = 256,
+        stats_window: int = 1000,
+    ):
+        self.predict_fn = predict_fn
+        self.executor = executor or InferenceExecutor()
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_queue_size = max_queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight: set = set()
+
+        # Achieved batching statistics
+        self._batch_sizes: Counter = Counter()
+        self._queue_delays_ms: deque = deque(maxlen=stats_window)
+        self._forward_ms: deque = deque(maxlen=stats_window)
+        self._total_requests = 0
+        self._total_batches = 0
+        self._rejected = 0
+
+    async def start(self) -> None:
+        if self._worker is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._slots = asyncio.Semaphore(self.executor.workers)
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        for task in list(self._in_flight):
+            task.cancel()
+        # Fail anything still waiting so callers don't hang forever
+        pending = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        self._fail(pending, RuntimeError("Batching engine stopped"))
+
+    @staticmethod
+    def _fail(batch: list, error: Exception) -> None:
+        for _, future, _ in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    async def submit(self, image: np.ndarray) -> Any:
+        """
+        Queues a single preprocessed image and waits for its prediction.
+        :param image: Array of shape (224, 224, 3).
+        :return: Whatever `predict_fn` returned for this image.
+        :raises InferenceQueueFull: If too many requests are already waiting.
+        """
+        if self._worker is None:
+            await self.start()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((image, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self._rejected += 1
+            raise InferenceQueueFull(
+                f"Prediction queue is full ({self.max_queue_size} requests waiting)"
+            )
+        return await future
+
+    async def _collect_batch(self) -> list:
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect_batch()
+            # Wait for a free executor worker before dispatching
+            await self._slots.acquire()
+            task = asyncio.create_task(self._dispatch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _dispatch(self, batch: list) -> None:
+        dispatched_at = time.perf_counter()
+        for _, _, enqueued_at in batch:
+            self._queue_delays_ms.append((dispatched_at - enqueued_at) * 1000)
+        self._batch_sizes[len(batch)] += 1
+        self._total_batches += 1
+        self._total_requests += len(batch)
+
+        try:
+            images = np.stack([image for image, _, _ in batch])
+            results = await self.executor.run(self.predict_fn, images)
+        except asyncio.CancelledError:
+            self._fail(batch, RuntimeError("Batching engine stopped"))
+            raise
+        except Exception as e:
+            self._fail(batch, e)
+            return
+        finally:
+            self._forward_ms.append((time.perf_counter() - dispatched_at) * 1000)
+            self._slots.release()
+
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Reports the batch sizes and queue delays actually achieved."""
+        delays = np.array(self._queue_delays_ms) if self._queue_delays_ms else np.zeros(1)
+        forward = np.array(self._forward_ms) if self._forward_ms else np.zeros(1)
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "total_requests": self._total_requests,
+            "total_batches": self._total_batches,
+            "rejected": self._rejected,
+            "mean_batch_size": (
+                round(self._total_requests / self._total_batches, 2) if self._total_batches else 0.0
+            ),
+            "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+            "queue_delay_ms": {
+                "p50": round(float(np.percentile(delays, 50)), 2),
+                "p95": round(float(np.percentile(delays, 95)), 2),
+                "max": round(float(delays.max()), 2),
+            },
+            "forward_pass_ms_mean": round(float(forward.mean()), 2),
+        }
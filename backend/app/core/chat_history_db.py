@@ -1,10 +1,123 @@
 import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING
 
 MONGODB_URI = os.getenv("MONGODB_URI")
 if not MONGODB_URI:
-    raise Exception("MONGODB_URI is not set in the environment.")
+    print("WARNING: MONGODB_URI is not set. Chat history endpoints will fail if called.")
+
+_client: Optional[AsyncIOMotorClient] = None
+
+
+def get_db():
+    """Returns the chat history database, creating the client on first use."""
+    global _client
+    if _client is None:
+        if not MONGODB_URI:
+            raise Exception("MONGODB_URI is not set in the environment.")
+        _client = AsyncIOMotorClient(MONGODB_URI)
+    # Specify your database name
+    return _client["chat_history_db"]
+
+
+async def ping() -> None:
+    await get_db().command("ping")
+
+
+def close_client() -> None:
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+# Only the fields the chat UI needs; session_id is already known to the caller
+HISTORY_PROJECTION = {"_id": 1, "sender": 1, "message": 1, "timestamp": 1}
+
+
+async def ensure_indexes() -> None:
+    """
+    Creates the compound index history reads are served from. `_id` breaks
+    ties between messages saved in the same batch (same timestamp).
+    Safe to call on every startup: existing indexes are left as they are.
+    """
+    await get_db().chat_history.create_index(
+        [("session_id", ASCENDING), ("timestamp", ASCENDING), ("_id", ASCENDING)],
+        name="session_id_timestamp",
+    )
+
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    return f"{doc['timestamp'].isoformat()}_{doc['_id']}"
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """:raises ValueError: If `cursor` wasn't produced by `encode_cursor`."""
+    timestamp, _, oid = cursor.rpartition("_")
+    try:
+        return datetime.fromisoformat(timestamp), ObjectId(oid)
+    except (ValueError, InvalidId):
+        raise ValueError(f"Invalid history cursor '{cursor}'")
+
+
+async def fetch_history(
+    session_id: str,
+    limit: int = 100,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Returns one page of a session's messages in chronological order, using
+    keyset pagination on (timestamp, _id).
+
+    Without a cursor the most recent `limit` messages are returned. Pass the
+    page's `before` cursor to get older messages, or its `after` cursor to
+    get newer ones. `has_more` tells whether the requested direction has
+    further messages. Legacy messages stored without a timestamp have no
+    place in that order and are left out.
+    """
+    if before and after:
+        raise ValueError("Pass either 'before' or 'after', not both")
+
+    # $type keeps the filter within the (session_id, timestamp, _id) index bounds
+    query: Dict[str, Any] = {"session_id": session_id, "timestamp": {"$type": "date"}}
+    cursor = before or after
+    if cursor:
+        timestamp, oid = decode_cursor(cursor)
+        op = "$gt" if after else "$lt"
+        query["$or"] = [
+            {"timestamp": {op: timestamp}},
+            {"timestamp": timestamp, "_id": {op: oid}},
+        ]
+    # Paging forward reads oldest-first; otherwise read newest-first and flip
+    direction = ASCENDING if after else DESCENDING
+    docs = await (
+        get_db().chat_history.find(query, HISTORY_PROJECTION)
+        .sort([("timestamp", direction), ("_id", direction)])
+        .limit(limit + 1)
+        .to_list(length=limit + 1)
+    )
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    if direction == DESCENDING:
+        docs.reverse()
 
-client = AsyncIOMotorClient(MONGODB_URI)
-# Specify your database name
-db = client["chat_history_db"]
+    history: List[Dict[str, Any]] = [
+        {
+            "_id": str(doc["_id"]),
+            "sender": doc.get("sender"),
+            "message": doc.get("message"),
+            "timestamp": str(doc["timestamp"]),
+        }
+        for doc in docs
+    ]
+    return {
+        "chat_history": history,
+        "has_more": has_more,
+        "before": encode_cursor(docs[0]) if docs else before,
+        "after": encode_cursor(docs[-1]) if docs else after,
+    }
@@ -0,0 +1,175 @@
+# chat_writer.py
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class ChatWriterBusy(Exception):
+    """Raised when the write-behind buffer stays full past the enqueue timeout, or is shut down."""
+
+
+class ChatHistoryWriter:
+    """
+    Write-behind buffer for chat history. Messages from concurrent requests
+    are grouped and persisted with one `insert_many` per flush, triggered
+    when `max_batch_size` messages are waiting or `flush_interval_ms` after
+    the first one arrived.
+
+    Acknowledgement stays explicit: `write` only returns once its messages
+    are in MongoDB (with their ids), and raises if they couldn't be stored.
+    At most `max_pending` messages may be buffered; beyond that, writers
+    wait up to `enqueue_timeout` seconds and then get ChatWriterBusy.
+    """
+
+    def __init__(
+        self,
+        get_collection: Callable[[], Any],
+        max_batch_size: int = 100,
+        flush_interval_ms: float = 50.0,
+        max_pending: int = 5000,
+        enqueue_timeout: float = 2.0,
+    ):
+        self.get_collection = get_collection
+        self.max_batch_size = max(1, max_batch_size)
+        self.flush_interval = max(0.0, flush_interval_ms) / 1000.0
+        self.max_pending = max(1, max_pending)
+        self.enqueue_timeout = enqueue_timeout
+        self._buffer: List[tuple] = []
+        self._pending = 0
+        self._space: Optional[asyncio.Condition] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping = False
+        # Set by stop(); later writes are rejected instead of restarting the worker
+        self._closed = False
+
+        self._flushes = 0
+        self._written = 0
+        self._failed = 0
+        self._rejected = 0
+        self._flush_ms_total = 0.0
+
+    async def start(self) -> None:
+        if self._worker is None:
+            self._space = asyncio.Condition()
+            self._wakeup = asyncio.Event()
+            self._stopping = False
+            self._closed = False
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Rejects new writes, flushes everything already buffered, then stops the worker."""
+        if self._worker is None:
+            self._closed = True
+            return
+        # Taken under the same lock writers enqueue under, so every write
+        # either lands in the buffer before the worker drains it or is rejected
+        async with self._space:
+            self._closed = True
+            self._stopping = True
+            self._space.notify_all()
+        self._wakeup.set()
+        await self._worker
+        self._worker = None
+
+    async def write(self, docs: List[Dict[str, Any]]) -> List[str]:
+        """
+        Buffers `docs` for insertion and waits until they are persisted.
+        :return: The inserted ids, in the same order as `docs`.
+        :raises ChatWriterBusy: If the buffer stayed full for `enqueue_timeout`,
+                                or the writer has been stopped.
+        """
+        if not docs:
+            return []
+        if len(docs) > self.max_pending:
+            raise ValueError(f"Cannot buffer more than {self.max_pending} messages at once")
+        if self._closed:
+            self._rejected += len(docs)
+            raise ChatWriterBusy("Chat history writer is shutting down.")
+        if self._worker is None:
+            await self.start()
+
+        loop = asyncio.get_running_loop()
+        futures = []
+        async with self._space:
+            try:
+                await asyncio.wait_for(
+                    self._space.wait_for(lambda: self._closed or self._pending + len(docs) <= self.max_pending),
+                    self.enqueue_timeout,
+                )
+            except asyncio.TimeoutError:
+                self._rejected += len(docs)
+                raise ChatWriterBusy("Chat history buffer is full. Please retry shortly.")
+            if self._closed:
+                self._rejected += len(docs)
+                raise ChatWriterBusy("Chat history writer is shutting down.")
+            self._pending += len(docs)
+            for doc in docs:
+                future = loop.create_future()
+                self._buffer.append((doc, future))
+                futures.append(future)
+        self._wakeup.set()
+        return list(await asyncio.gather(*futures))
+
+    async def _run(self) -> None:
+        while True:
+            if not self._buffer:
+                if self._stopping:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            # Give concurrent writers a moment to join this batch
+            deadline = time.perf_counter() + self.flush_interval
+            while len(self._buffer) < self.max_batch_size and not self._stopping:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                await asyncio.sleep(min(remaining, 0.005))
+            batch = self._buffer[: self.max_batch_size]
+            del self._buffer[: self.max_batch_size]
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[tuple]) -> None:
+        docs = [doc for doc, _ in batch]
+        started_at = time.perf_counter()
+        inserted = 0
+        error: Optional[Exception] = None
+        try:
+            await self.get_collection().insert_many(docs, ordered=True)
+            inserted = len(docs)
+        except Exception as e:
+            # With ordered=True everything before the failing document is stored
+            details = getattr(e, "details", None) or {}
+            inserted = details.get("nInserted", 0)
+            error = e
+            print(f"Error flushing chat history ({inserted}/{len(docs)} stored): {e}")
+        finally:
+            self._flushes += 1
+            self._flush_ms_total += (time.perf_counter() - started_at) * 1000
+
+        for i, (doc, future) in enumerate(batch):
+            if future.done():
+                continue
+            if i < inserted:
+                future.set_result(str(doc["_id"]))
+            else:
+                future.set_exception(error or RuntimeError("Chat message was not stored"))
+        self._written += inserted
+        self._failed += len(docs) - inserted
+
+        async with self._space:
+            self._pending -= len(batch)
+            self._space.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "flushes": self._flushes,
+            "written": self._written,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "mean_batch_size": round(self._written / self._flushes, 2) if self._flushes else 0.0,
+            "mean_flush_ms": round(self._flush_ms_total / self._flushes, 2) if self._flushes else 0.0,
+        }
@@ -0,0 +1,135 @@
+# db_pool.py
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+from psycopg2 import pool as pg_pool
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free within the acquire timeout."""
+
+
+class PostgresPool:
+    """
+    A thread-safe PostgreSQL connection pool shared across requests.
+
+    Connections are opened lazily (up to `maxconn`), get a server-side
+    `statement_timeout`, and are health-checked with `SELECT 1` when they
+    have been idle for longer than `health_check_interval` seconds. When all
+    connections are busy, callers wait up to `acquire_timeout` seconds.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        minconn: int = 1,
+        maxconn: int = 10,
+        statement_timeout_ms: int = 5000,
+        health_check_interval: float = 30.0,
+        acquire_timeout: float = 10.0,
+    ):
+        self.dsn = dsn
+        self.minconn = max(0, minconn)
+        self.maxconn = max(1, maxconn, self.minconn)
+        self.statement_timeout_ms = statement_timeout_ms
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self._pool = None
+        self._init_lock = threading.Lock()
+        # ThreadedConnectionPool raises when exhausted; this makes callers wait instead
+        self._slots = threading.BoundedSemaphore(self.maxconn)
+        self._last_used: Dict[int, float] = {}
+
+    def _get_pool(self) -> pg_pool.ThreadedConnectionPool:
+        if self._pool is None:
+            with self._init_lock:
+                if self._pool is None:
+                    self._pool = pg_pool.ThreadedConnectionPool(
+                        self.minconn,
+                        self.maxconn,
+                        self.dsn,
+                        options=f"-c statement_timeout={self.statement_timeout_ms}",
+                    )
+        return self._pool
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        idle_for = time.monotonic() - self._last_used.get(id(conn), 0.0)
+        if idle_for < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _checkout(self):
+        pool = self._get_pool()
+        conn = pool.getconn()
+        if not self._is_healthy(conn):
+            # Drop the broken connection and open a fresh one in its place
+            self._last_used.pop(id(conn), None)
+            pool.putconn(conn, close=True)
+            conn = pool.getconn()
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """
+        Yields a pooled connection. The transaction is committed if the block
+        succeeds and rolled back otherwise; the connection is always returned.
+        """
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise PoolTimeout(f"No database connection available after {self.acquire_timeout}s")
+        try:
+            conn = self._checkout()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                if not conn.closed:
+                    conn.rollback()
+                raise
+            finally:
+                self._last_used[id(conn)] = time.monotonic()
+                self._pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        with self._init_lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+                self._last_used.clear()
+
+
+# ----------------- Shared pools (one per DSN) ----------------- #
+_pools: Dict[str, PostgresPool] = {}
+_pools_lock = threading.Lock()
+
+def get_pool(dsn: str) -> PostgresPool:
+    """Returns the process-wide pool for `dsn`, creating it from env settings on first use."""
+    with _pools_lock:
+        if dsn not in _pools:
+            _pools[dsn] = PostgresPool(
+                dsn,
+                minconn=int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+                maxconn=int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+                statement_timeout_ms=int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "5000")),
+                health_check_interval=float(os.getenv("DB_HEALTH_CHECK_INTERVAL_SECONDS", "30")),
+                acquire_timeout=float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT_SECONDS", "10")),
+            )
+        return _pools[dsn]
+
+def close_all_pools() -> None:
+    with _pools_lock:
+        for db_pool in _pools.values():
+            db_pool.close()
+        _pools.clear()
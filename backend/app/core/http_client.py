@@ -0,0 +1,56 @@
+# http_client.py
+from typing import Any, Dict, Optional
+
+import httpx
+
+
+class SharedAsyncClient:
+    """
+    A long-lived httpx.AsyncClient for calls to one upstream service, so
+    requests reuse pooled keep-alive connections instead of paying for a new
+    TCP/TLS handshake each time.
+
+    Normally opened and closed by the app lifespan; `get` opens it lazily if
+    it is used before startup (e.g. from a script).
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        timeout_seconds: float = 30.0,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout_seconds)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._requests = 0
+
+    async def start(self) -> None:
+        self._ensure_client()
+
+    def _ensure_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+        return self._client
+
+    def get(self) -> httpx.AsyncClient:
+        self._requests += 1
+        return self._ensure_client()
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "open": self._client is not None and not self._client.is_closed,
+            "requests": self._requests,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+        }
@@ -0,0 +1,138 @@
+# inference_executor.py
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference pool cannot accept more work right now."""
+
+
+def _call_then_wait(barrier, timeout: float, fn: Optional[Callable], args: Tuple) -> Any:
+    try:
+        result = fn(*args) if fn is not None else None
+    except BaseException:
+        # Release the workers already waiting instead of letting them sit out the timeout
+        barrier.abort()
+        raise
+    # Hold this worker until every other one has a call too, so no worker takes two
+    barrier.wait(timeout)
+    return result
+
+
+class InferenceExecutor:
+    """
+    A dedicated, bounded pool for blocking model inference so that forward
+    passes never run on the event loop.
+
+    At most `workers` jobs run at once and at most `max_queue_size` more may
+    wait behind them; anything beyond that is rejected with InferenceQueueFull
+    so the API can answer with 503 + Retry-After instead of piling up latency.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        max_queue_size: int = 64,
+        kind: str = "thread",
+        initializer: Optional[Callable] = None,
+        initargs: Tuple = (),
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind '{kind}' (expected 'thread' or 'process')")
+        self.workers = max(1, workers)
+        self.max_queue_size = max(0, max_queue_size)
+        self.kind = kind
+        self._initializer = initializer
+        self._initargs = initargs
+        self._pool: Optional[Executor] = None
+        self._pending = 0
+        self._rejected = 0
+        self._completed = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.max_queue_size
+
+    @property
+    def saturated(self) -> bool:
+        return self._pending >= self.capacity
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=self._initializer,
+                    initargs=self._initargs,
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="inference",
+                    initializer=self._initializer,
+                    initargs=self._initargs,
+                )
+        return self._pool
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """
+        Runs `fn(*args)` on the pool and awaits its result.
+        In process mode `fn` and its arguments must be picklable.
+        :raises InferenceQueueFull: If the pool and its queue are already full.
+        """
+        if self.saturated:
+            self._rejected += 1
+            raise InferenceQueueFull(
+                f"Inference pool is saturated ({self._pending}/{self.capacity} jobs)"
+            )
+        self._pending += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._get_pool(), fn, *args)
+            self._completed += 1
+            return result
+        finally:
+            self._pending -= 1
+
+    async def run_on_every_worker(self, fn: Optional[Callable] = None, *args, timeout: float = 600) -> list:
+        """
+        Starts every worker (running the pool initializer, e.g. loading the
+        model in process mode) and calls `fn(*args)` once in each of them.
+        Each call waits at a barrier until all `workers` calls are running,
+        which guarantees they land on distinct workers.
+        :return: Each worker's result.
+        """
+        manager = None
+        if self.kind == "process":
+            # Plain multiprocessing barriers can't be sent to pool workers; a managed one can
+            manager = await asyncio.to_thread(multiprocessing.Manager)
+            barrier = manager.Barrier(self.workers)
+        else:
+            barrier = threading.Barrier(self.workers)
+        try:
+            loop = asyncio.get_running_loop()
+            pool = self._get_pool()
+            return await asyncio.gather(*[
+                loop.run_in_executor(pool, _call_then_wait, barrier, timeout, fn, args)
+                for _ in range(self.workers)
+            ])
+        finally:
+            if manager is not None:
+                manager.shutdown()
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_queue_size": self.max_queue_size,
+            "pending": self._pending,
+            "completed": self._completed,
+            "rejected": self._rejected,
+        }
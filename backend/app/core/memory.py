@@ -1,39 +1,388 @@
 # memory.py
-from typing import List, Dict, Any
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Set
+
+# Rough per-message bookkeeping cost (dict, deque slot) on top of the text itself
+_MESSAGE_OVERHEAD_BYTES = 120
+
+
+def _message_size(message: Dict[str, Any]) -> int:
+    return len(message["content"].encode("utf-8")) + _MESSAGE_OVERHEAD_BYTES
+
+
+class MemoryBackend(ABC):
+    """
+    Storage interface behind WindowMemoryManager. `append` must add the
+    message and trim the session to `max_messages` as one atomic step.
+    """
+
+    @abstractmethod
+    def load(self, session_id: str) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def append(self, session_id: str, message: Dict[str, Any], max_messages: int) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self, session_id: str) -> None:
+        ...
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+    def close(self) -> None:
+        pass
+
+
+class _Session:
+    __slots__ = ("messages", "bytes", "last_access")
+
+    def __init__(self, max_messages: int):
+        self.messages: Deque[Dict[str, Any]] = deque(maxlen=max_messages)
+        self.bytes = 0
+        self.last_access = time.monotonic()
+
+
+class InProcessMemoryBackend(MemoryBackend):
+    """
+    Keeps conversations in this process's RAM. Fastest option, but each
+    uvicorn worker sees only its own sessions.
+
+    Memory is bounded overall: sessions idle for longer than
+    `idle_ttl_seconds` are dropped, and the least recently used sessions are
+    evicted whenever there are more than `max_sessions` or the stored
+    messages exceed roughly `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        idle_ttl_seconds: Optional[float] = 3600,
+    ):
+        self.max_sessions = max(1, max_sessions)
+        self.max_bytes = max_bytes
+        self.idle_ttl_seconds = idle_ttl_seconds
+        # {session_id: _Session}, ordered from least to most recently used
+        self._storage: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+        self._evicted_lru = 0
+        self._evicted_idle = 0
+
+    def load(self, session_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._evict_idle()
+            session = self._storage.get(session_id)
+            if session is None:
+                return []
+            self._touch(session_id, session)
+            # Return a copy of the conversation
+            return list(session.messages)
+
+    def append(self, session_id: str, message: Dict[str, Any], max_messages: int) -> None:
+        size = _message_size(message)
+        with self._lock:
+            self._evict_idle()
+            session = self._storage.get(session_id)
+            if session is None:
+                session = _Session(max_messages)
+                self._storage[session_id] = session
+            # The deque drops its oldest message itself once the window is full
+            if len(session.messages) == session.messages.maxlen:
+                dropped = _message_size(session.messages[0])
+                session.bytes -= dropped
+                self._total_bytes -= dropped
+            session.messages.append(message)
+            session.bytes += size
+            self._total_bytes += size
+            self._touch(session_id, session)
+            self._evict_lru(keep=session_id)
+
+    def clear(self, session_id: str) -> None:
+        with self._lock:
+            if session_id in self._storage:
+                self._drop(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            messages = sum(len(s.messages) for s in self._storage.values())
+            return {
+                "backend": "inprocess",
+                "sessions": len(self._storage),
+                "messages": messages,
+                "approx_bytes": self._total_bytes,
+                "max_sessions": self.max_sessions,
+                "max_bytes": self.max_bytes,
+                "idle_ttl_seconds": self.idle_ttl_seconds,
+                "evicted_lru": self._evicted_lru,
+                "evicted_idle": self._evicted_idle,
+            }
+
+    def _touch(self, session_id: str, session: _Session) -> None:
+        session.last_access = time.monotonic()
+        self._storage.move_to_end(session_id)
+
+    def _drop(self, session_id: str) -> None:
+        session = self._storage.pop(session_id)
+        self._total_bytes -= session.bytes
+
+    def _evict_idle(self) -> None:
+        if not self.idle_ttl_seconds:
+            return
+        cutoff = time.monotonic() - self.idle_ttl_seconds
+        # Least recently used sessions come first, so stop at the first fresh one
+        while self._storage:
+            session_id, session = next(iter(self._storage.items()))
+            if session.last_access > cutoff:
+                break
+            self._drop(session_id)
+            self._evicted_idle += 1
+
+    def _evict_lru(self, keep: str) -> None:
+        while len(self._storage) > 1 and (
+            len(self._storage) > self.max_sessions or self._total_bytes > self.max_bytes
+        ):
+            session_id = next(iter(self._storage))
+            if session_id == keep:
+                break
+            self._drop(session_id)
+            self._evicted_lru += 1
+
+
+class SQLiteMemoryBackend(MemoryBackend):
+    """
+    Keeps conversations in a local SQLite database in WAL mode, so every
+    uvicorn worker (or process on the same host) shares the same sessions
+    without an external service.
+
+    Each append inserts the message and trims the session's window inside a
+    single `BEGIN IMMEDIATE` transaction. Idle and excess sessions are swept
+    every `sweep_every` appends.
+    """
+
+    def __init__(
+        self,
+        path: str = "conversation_memory.sqlite3",
+        max_sessions: int = 10000,
+        idle_ttl_seconds: Optional[float] = 3600,
+        sweep_every: int = 500,
+        busy_timeout_ms: int = 5000,
+    ):
+        self.path = path
+        self.max_sessions = max(1, max_sessions)
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.sweep_every = max(1, sweep_every)
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        # Every thread's connection, so close() can reach them all
+        self._connections: Set[sqlite3.Connection] = set()
+        self._connections_lock = threading.Lock()
+        self._appends = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    last_access REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_sessions_last_access ON sessions (last_access);
+                CREATE TABLE IF NOT EXISTS messages (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_messages_session_seq ON messages (session_id, seq);
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections aren't shareable across
+        # threads (check_same_thread is off only so close() can close them all)
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            with self._connections_lock:
+                if conn in self._connections:
+                    return conn
+        conn = sqlite3.connect(
+            self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        self._local.conn = conn
+        with self._connections_lock:
+            self._connections.add(conn)
+        return conn
+
+    def load(self, session_id: str) -> List[Dict[str, Any]]:
+        conn = self._connect()
+        cutoff = time.time() - self.idle_ttl_seconds if self.idle_ttl_seconds else None
+        row = conn.execute("SELECT last_access FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None or (cutoff is not None and row[0] <= cutoff):
+            return []
+        conn.execute("UPDATE sessions SET last_access = ? WHERE session_id = ?", (time.time(), session_id))
+        rows = conn.execute(
+            "SELECT role, content FROM messages WHERE session_id = ? ORDER BY seq",
+            (session_id,),
+        ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def append(self, session_id: str, message: Dict[str, Any], max_messages: int) -> None:
+        conn = self._connect()
+        now = time.time()
+        cutoff = now - self.idle_ttl_seconds if self.idle_ttl_seconds else None
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT last_access FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if row is not None and cutoff is not None and row[0] <= cutoff:
+                # Expired but not yet swept: start the session over
+                conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            conn.execute(
+                "INSERT INTO sessions (session_id, last_access) VALUES (?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET last_access = excluded.last_access",
+                (session_id, now),
+            )
+            conn.execute(
+                "INSERT INTO messages (session_id, role, content) VALUES (?, ?, ?)",
+                (session_id, message["role"], message["content"]),
+            )
+            # Trim to the newest max_messages entries
+            conn.execute(
+                """
+                DELETE FROM messages
+                WHERE session_id = ? AND seq <= (
+                    SELECT seq FROM messages WHERE session_id = ?
+                    ORDER BY seq DESC LIMIT 1 OFFSET ?
+                )
+                """,
+                (session_id, session_id, max_messages),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._appends += 1
+        if self._appends % self.sweep_every == 0:
+            self.sweep()
+
+    def clear(self, session_id: str) -> None:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def sweep(self) -> None:
+        """Deletes idle sessions and the least recently used ones beyond max_sessions."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self.idle_ttl_seconds:
+                conn.execute(
+                    "DELETE FROM sessions WHERE last_access <= ?",
+                    (time.time() - self.idle_ttl_seconds,),
+                )
+            conn.execute(
+                """
+                DELETE FROM sessions WHERE session_id IN (
+                    SELECT session_id FROM sessions
+                    ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_sessions,),
+            )
+            conn.execute("DELETE FROM messages WHERE session_id NOT IN (SELECT session_id FROM sessions)")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        sessions = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        messages, content_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(CAST(content AS BLOB))), 0) FROM messages"
+        ).fetchone()
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "sessions": sessions,
+            "messages": messages,
+            "approx_bytes": content_bytes,
+            "file_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            "max_sessions": self.max_sessions,
+            "idle_ttl_seconds": self.idle_ttl_seconds,
+        }
+
+    def close(self) -> None:
+        """Closes every thread's connection; a later call opens a fresh one."""
+        with self._connections_lock:
+            connections, self._connections = self._connections, set()
+        for conn in connections:
+            conn.close()
+        self._local.conn = None
+
+
+def create_memory_backend() -> MemoryBackend:
+    """Builds the backend selected by MEMORY_BACKEND ("inprocess" by default, or "sqlite")."""
+    backend = os.getenv("MEMORY_BACKEND", "inprocess").lower()
+    max_sessions = int(os.getenv("MEMORY_MAX_SESSIONS", "10000"))
+    idle_ttl_seconds = float(os.getenv("MEMORY_IDLE_TTL_SECONDS", "3600"))
+    if backend == "sqlite":
+        return SQLiteMemoryBackend(
+            path=os.getenv("MEMORY_SQLITE_PATH", "conversation_memory.sqlite3"),
+            max_sessions=max_sessions,
+            idle_ttl_seconds=idle_ttl_seconds,
+        )
+    if backend == "inprocess":
+        return InProcessMemoryBackend(
+            max_sessions=max_sessions,
+            max_bytes=int(os.getenv("MEMORY_MAX_BYTES", str(64 * 1024 * 1024))),
+            idle_ttl_seconds=idle_ttl_seconds,
+        )
+    raise ValueError(f"Unknown MEMORY_BACKEND '{backend}' (expected 'inprocess' or 'sqlite')")
+
 
 class WindowMemoryManager:
     """
-    An ephemeral in-memory conversation store with a fixed window size.
+    A conversation store with a fixed window size.
     Stores up to `window_size * 2` messages (i.e., user+assistant pairs).
+    Where the messages live is up to the `backend` (in-process by default).
     """
 
-    def __init__(self, window_size: int = 10):
+    def __init__(self, window_size: int = 10, backend: Optional[MemoryBackend] = None):
         self.window_size = window_size
-        # {session_id: [ {role: "...", content: "..."}, ... ]}
-        self._storage: Dict[str, List[Dict[str, Any]]] = {}
+        self.backend = backend or InProcessMemoryBackend()
 
     def load_conversation(self, session_id: str) -> List[Dict[str, Any]]:
-        # Return a copy of the conversation
-        return list(self._storage.get(session_id, []))
+        return self.backend.load(session_id)
 
     def save_user_message(self, session_id: str, content: str) -> None:
-        conversation = self._storage.setdefault(session_id, [])
-        conversation.append({"role": "user", "content": content})
-        self._prune(session_id)
+        self.backend.append(session_id, {"role": "user", "content": content}, self.window_size * 2)
 
     def save_assistant_message(self, session_id: str, content: str) -> None:
-        conversation = self._storage.setdefault(session_id, [])
-        conversation.append({"role": "assistant", "content": content})
-        self._prune(session_id)
+        self.backend.append(session_id, {"role": "assistant", "content": content}, self.window_size * 2)
 
     def clear_conversation(self, session_id: str) -> None:
-        if session_id in self._storage:
-            del self._storage[session_id]
-
-    def _prune(self, session_id: str) -> None:
-        """Ensures we don't exceed window_size*2 messages."""
-        conversation = self._storage[session_id]
-        max_messages = self.window_size * 2
-        if len(conversation) > max_messages:
-            overflow = len(conversation) - max_messages
-            self._storage[session_id] = conversation[overflow:]
+        self.backend.clear(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Memory usage figures, e.g. for sizing containers."""
+        return self.backend.stats()
+
+    def close(self) -> None:
+        self.backend.close()
@@ -1,26 +1,160 @@
 import os
+import threading
 import numpy as np
 import cv2
-from tensorflow.keras.models import load_model
+
+MODEL_RUNTIMES = ("keras", "tflite")
+
+def _load_tflite_interpreter():
+    """Returns the TFLite Interpreter class, preferring the small `tflite_runtime` package."""
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        import tensorflow as tf
+    except ImportError:
+        raise ImportError(
+            "MODEL_RUNTIME=tflite needs either the 'tflite-runtime' or the 'tensorflow' package installed"
+        )
+    return tf.lite.Interpreter
+
+class _TFLiteModel:
+    """
+    Serves a TFLite export of the classifier. Uses the small `tflite_runtime`
+    package when installed, so the API doesn't need to import TensorFlow.
+
+    Micro-batches vary in size, and resizing an interpreter's input means
+    reallocating all its tensors. Instead there is one interpreter per batch
+    size bucket (powers of two up to `max_batch_size`), allocated once; a
+    batch is zero-padded up to its bucket and the padding sliced off the
+    output. Batches above `max_batch_size` run in chunks.
+    """
+
+    def __init__(self, model_path: str, max_batch_size: int = 8):
+        Interpreter = _load_tflite_interpreter()
+        self.max_batch_size = max(1, max_batch_size)
+        self.bucket_sizes = []
+        size = 1
+        while size < self.max_batch_size:
+            self.bucket_sizes.append(size)
+            size *= 2
+        self.bucket_sizes.append(self.max_batch_size)
+
+        # {bucket size: (interpreter, lock)}; an interpreter must not be
+        # invoked from two threads at once
+        self._interpreters = {}
+        for size in self.bucket_sizes:
+            interpreter = Interpreter(model_path=model_path)
+            input_details = interpreter.get_input_details()[0]
+            interpreter.resize_tensor_input(input_details["index"], [size] + list(input_details["shape"][1:]))
+            interpreter.allocate_tensors()
+            self._interpreters[size] = (interpreter, threading.Lock())
+        interpreter = self._interpreters[1][0]
+        self.input = interpreter.get_input_details()[0]
+        self.output = interpreter.get_output_details()[0]
+
+    def predict(self, img_batch: np.ndarray) -> np.ndarray:
+        return np.concatenate([
+            self._predict_chunk(img_batch[start:start + self.max_batch_size])
+            for start in range(0, len(img_batch), self.max_batch_size)
+        ])
+
+    def _predict_chunk(self, img_batch: np.ndarray) -> np.ndarray:
+        n = len(img_batch)
+        size = next(s for s in self.bucket_sizes if s >= n)
+        batch = img_batch
+        if n < size:
+            batch = np.concatenate([img_batch, np.zeros((size - n,) + img_batch.shape[1:], dtype=img_batch.dtype)])
+        scale, zero_point = self.input["quantization"]
+        if self.input["dtype"] != np.float32:
+            # Fully integer models take quantized input
+            batch = np.round(batch / scale + zero_point).astype(self.input["dtype"])
+        interpreter, lock = self._interpreters[size]
+        with lock:
+            interpreter.set_tensor(self.input["index"], batch)
+            interpreter.invoke()
+            output = interpreter.get_tensor(self.output["index"])[:n]
+        scale, zero_point = self.output["quantization"]
+        if self.output["dtype"] != np.float32:
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
 
 class OralDiseaseClassifier:
-    def __init__(self, model_path: str):
-        self.model = load_model(model_path)
+    def __init__(self, model_path: str, runtime: str = None, max_batch_size: int = 8):
+        """
+        :param model_path: Keras .h5 model, or a .tflite export of it.
+        :param runtime: "keras" or "tflite"; inferred from the file extension if omitted.
+        :param max_batch_size: Largest batch the tflite runtime allocates tensors for.
+        """
+        if runtime is None:
+            runtime = "tflite" if model_path.endswith(".tflite") else "keras"
+        if runtime not in MODEL_RUNTIMES:
+            raise ValueError(f"Unknown model runtime '{runtime}' (expected one of {MODEL_RUNTIMES})")
+        self.runtime = runtime
+        if runtime == "tflite":
+            self.model = _TFLiteModel(model_path, max_batch_size)
+            self._forward = self.model.predict
+        else:
+            from tensorflow.keras.models import load_model
+
+            self.model = load_model(model_path)
+            # A direct call skips the data adapter and step loop `predict` sets up on every call
+            self._forward = lambda img_batch: self.model(img_batch, training=False).numpy()
         self.class_labels = ["Caries", "Gingivitis"]
 
-    def preprocess_image(self, image_path: str):
-        img = cv2.imread(image_path)
-        if img is None:
-            raise ValueError(f"Image at path '{image_path}' could not be read")
+    @staticmethod
+    def load_image(source):
+        """
+        Reads and normalizes a single image to a (224, 224, 3) float32 array.
+        :param source: Raw encoded image bytes (bytes, bytearray or memoryview),
+                       or a path to an image file on disk.
+        """
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            buffer = np.frombuffer(source, dtype=np.uint8)
+            img = cv2.imdecode(buffer, cv2.IMREAD_COLOR) if buffer.size else None
+            if img is None:
+                raise ValueError("Uploaded image could not be read")
+        else:
+            img = cv2.imread(source)
+            if img is None:
+                raise ValueError(f"Image at path '{source}' could not be read")
         img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
         img = cv2.resize(img, (224, 224))
-        img_array = np.array(img) / 255.0
+        return img.astype(np.float32) / 255.0
+
+    def preprocess_image(self, source):
+        img_array = self.load_image(source)
         img_array = np.expand_dims(img_array, axis=0)
         return img_array
 
-    def predict(self, image_path: str):
-        img_array = self.preprocess_image(image_path)
-        predictions = self.model.predict(img_array)
-        predicted_class = np.argmax(predictions, axis=1)[0]
-        confidence = np.max(predictions) * 100
-        return self.class_labels[predicted_class], round(confidence, 2)
\ No newline at end of file
+    def predict_batch(self, img_batch: np.ndarray):
+        """
+        Runs one forward pass over a stacked batch of preprocessed images.
+        :param img_batch: Array of shape (N, 224, 224, 3).
+        :return: A list of (label, confidence) tuples, one per image, in order.
+        """
+        predictions = self._forward(img_batch)
+        predicted_classes = np.argmax(predictions, axis=1)
+        confidences = np.max(predictions, axis=1) * 100
+        return [
+            (self.class_labels[cls], round(float(conf), 2))
+            for cls, conf in zip(predicted_classes, confidences)
+        ]
+
+    def predict(self, source):
+        img_array = self.preprocess_image(source)
+        return self.predict_batch(img_array)[0]
+
+# ----------------- Process-pool worker helpers ----------------- #
+# When inference runs in a process pool, each worker process loads its own
+# copy of the model once (via `init_worker`) and serves batches from it.
+_worker_classifier = None
+
+def init_worker(model_path: str, runtime: str = None, max_batch_size: int = 8):
+    global _worker_classifier
+    _worker_classifier = OralDiseaseClassifier(model_path, runtime, max_batch_size)
+
+def predict_batch_in_worker(img_batch: np.ndarray):
+    return _worker_classifier.predict_batch(img_batch)
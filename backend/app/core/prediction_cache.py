@@ -0,0 +1,56 @@
+# prediction_cache.py
+import hashlib
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.cache import LRUCache
+
+
+def model_file_version(model_path: str) -> str:
+    """Identifies a model file by its size and mtime."""
+    try:
+        st = os.stat(model_path)
+        return f"{st.st_size}-{st.st_mtime_ns}"
+    except OSError:
+        return "missing"
+
+
+class PredictionCache:
+    """
+    Remembers (prediction, confidence) per uploaded image, keyed by a hash
+    of the raw bytes plus the model version, so re-uploads of the same photo
+    skip decoding and inference.
+
+    The model version is the one recorded with `set_model_version` when the
+    model was loaded (not the file currently on disk, which may have been
+    swapped under the running model). Loading a different version drops
+    every cached entry.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: Optional[float] = None):
+        self.cache = LRUCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self._version: Optional[str] = None
+        self._invalidations = 0
+
+    def set_model_version(self, version: str) -> None:
+        if version != self._version:
+            if self._version is not None:
+                self.cache.clear()
+                self._invalidations += 1
+            self._version = version
+
+    def key_for(self, content: bytes) -> str:
+        digest = hashlib.blake2b(content, digest_size=16).hexdigest()
+        return f"{self._version}:{digest}"
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        return self.cache.get(key)
+
+    def set(self, key: str, result: Tuple[str, float]) -> None:
+        self.cache.set(key, result)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.cache.stats()
+        stats["model_version"] = self._version
+        stats["invalidations"] = self._invalidations
+        return stats
@@ -0,0 +1,89 @@
+# search.py
+import json
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercases and strips punctuation/extra whitespace so trivially different
+    phrasings ("What causes gingivitis?" vs "what causes  gingivitis") share a key."""
+    return " ".join(_TOKEN_RE.findall(query.lower()))
+
+
+class SearchBackend(ABC):
+    """Interface for the web search used by SearchTool."""
+
+    name = "base"
+
+    @abstractmethod
+    def search(self, query: str) -> List[Dict[str, str]]:
+        """Returns a list of {"url": ..., "content": ...} results."""
+
+
+class TavilySearchBackend(SearchBackend):
+    """Live web search through Tavily (requires TAVILY_API_KEY)."""
+
+    name = "tavily"
+
+    def __init__(self, max_results: int = 5):
+        from langchain_community.tools.tavily_search import TavilySearchResults
+
+        self._search = TavilySearchResults(max_results=max_results)
+
+    def search(self, query: str) -> List[Dict[str, str]]:
+        return self._search.run(query)
+
+
+class LocalSearchBackend(SearchBackend):
+    """
+    Offline stand-in that ranks a local corpus by keyword overlap. Useful for
+    benchmarks and tests that must not touch the network.
+    The corpus is a list of {"url", "title", "content"} documents, given
+    directly or as a JSON file.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        documents: Optional[List[Dict[str, str]]] = None,
+        corpus_path: Optional[str] = None,
+        max_results: int = 5,
+    ):
+        if documents is None and corpus_path:
+            with open(corpus_path, "r", encoding="utf-8") as f:
+                documents = json.load(f)
+        self.documents = documents or []
+        self.max_results = max_results
+        self._doc_tokens = [
+            set(_TOKEN_RE.findall(f"{doc.get('title', '')} {doc.get('content', '')}".lower()))
+            for doc in self.documents
+        ]
+
+    def search(self, query: str) -> List[Dict[str, str]]:
+        query_tokens = set(_TOKEN_RE.findall(query.lower()))
+        scored = [
+            (len(query_tokens & tokens), idx)
+            for idx, tokens in enumerate(self._doc_tokens)
+            if query_tokens & tokens
+        ]
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [
+            {"url": self.documents[idx].get("url", ""), "content": self.documents[idx].get("content", "")}
+            for _, idx in scored[: self.max_results]
+        ]
+
+
+def create_search_backend() -> SearchBackend:
+    """Builds the backend selected by SEARCH_BACKEND ("tavily" by default, or "local")."""
+    backend = os.getenv("SEARCH_BACKEND", "tavily").lower()
+    max_results = int(os.getenv("SEARCH_MAX_RESULTS", "5"))
+    if backend == "local":
+        return LocalSearchBackend(corpus_path=os.getenv("SEARCH_LOCAL_CORPUS"), max_results=max_results)
+    if backend == "tavily":
+        return TavilySearchBackend(max_results=max_results)
+    raise ValueError(f"Unknown SEARCH_BACKEND '{backend}' (expected 'tavily' or 'local')")
@@ -0,0 +1,74 @@
+# startup.py
+import asyncio
+import time
+from typing import Any, Callable, Dict, List
+
+
+class StartupTracker:
+    """
+    Loads heavy components (model, agent, database clients) from the app
+    lifespan and records each one's state and load time for the readiness
+    probe. Components can load in the background so the API starts serving
+    (and answering liveness checks) right away.
+
+    Readiness only waits for components registered as `required`; the rest
+    are reported but don't hold back traffic.
+    """
+
+    def __init__(self):
+        self._components: Dict[str, Dict[str, Any]] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    async def load(self, name: str, fn: Callable, required: bool = True, background: bool = False) -> None:
+        """
+        Runs `fn` (sync functions go to a worker thread so the event loop
+        keeps serving) and records the outcome under `name`. Failures are
+        logged and reported, never raised, so one component can't stop the
+        API from starting.
+        """
+        self._components[name] = {"state": "pending", "required": required, "load_ms": None, "error": None}
+        if background:
+            self._tasks.append(asyncio.create_task(self._load(name, fn)))
+        else:
+            await self._load(name, fn)
+
+    async def _load(self, name: str, fn: Callable) -> None:
+        component = self._components[name]
+        component["state"] = "loading"
+        started_at = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(fn):
+                await fn()
+            else:
+                await asyncio.to_thread(fn)
+            component["state"] = "ready"
+        except Exception as e:
+            component["state"] = "failed"
+            component["error"] = str(e)
+            print(f"WARNING: {name} failed to load: {e}")
+        finally:
+            component["load_ms"] = round((time.perf_counter() - started_at) * 1000, 1)
+            if component["state"] == "ready":
+                print(f"{name} ready in {component['load_ms']} ms")
+
+    def is_ready(self, name: str) -> bool:
+        return self._components.get(name, {}).get("state") == "ready"
+
+    @property
+    def ready(self) -> bool:
+        return all(c["state"] == "ready" for c in self._components.values() if c["required"])
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "components": {name: dict(c) for name, c in self._components.items()},
+        }
+
+
+startup_tracker = StartupTracker()
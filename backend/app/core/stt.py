@@ -0,0 +1,149 @@
+# stt.py
+import asyncio
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, Optional
+from urllib.parse import urlencode
+
+
+class STTSession(ABC):
+    """
+    One streaming transcription: audio goes in through `send`, transcripts
+    come out of `results` as {"text": ..., "is_final": bool} until the
+    provider has processed everything sent before `finish`.
+    """
+
+    @abstractmethod
+    async def send(self, chunk: bytes) -> None:
+        ...
+
+    @abstractmethod
+    async def finish(self) -> None:
+        """Signals that no more audio will be sent."""
+
+    @abstractmethod
+    def results(self) -> AsyncIterator[Dict[str, Any]]:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+class StreamingSTTBackend(ABC):
+    """Interface for the real-time speech-to-text used by /transcribe/ws."""
+
+    name = "base"
+
+    @abstractmethod
+    async def open_session(self) -> STTSession:
+        ...
+
+
+class _DeepgramSession(STTSession):
+    def __init__(self, ws):
+        self._ws = ws
+
+    async def send(self, chunk: bytes) -> None:
+        await self._ws.send(chunk)
+
+    async def finish(self) -> None:
+        # Deepgram flushes the remaining results, then closes the socket
+        await self._ws.send(json.dumps({"type": "CloseStream"}))
+
+    async def results(self) -> AsyncIterator[Dict[str, Any]]:
+        import websockets
+
+        try:
+            async for raw in self._ws:
+                data = json.loads(raw)
+                if data.get("type") != "Results":
+                    continue
+                transcript = (
+                    data.get("channel", {})
+                        .get("alternatives", [{}])[0]
+                        .get("transcript", "")
+                )
+                if transcript:
+                    yield {"text": transcript, "is_final": bool(data.get("is_final"))}
+        except websockets.ConnectionClosed:
+            return
+
+    async def close(self) -> None:
+        await self._ws.close()
+
+
+class DeepgramStreamingBackend(StreamingSTTBackend):
+    """Deepgram's live transcription WebSocket (requires DEEPGRAM_API_KEY)."""
+
+    name = "deepgram"
+
+    def __init__(self, api_key: str, url: str = "wss://api.deepgram.com/v1/listen", model: str = "nova"):
+        if not api_key:
+            raise ValueError("DEEPGRAM_API_KEY is required for the deepgram STT backend")
+        self.api_key = api_key
+        self.url = url
+        self.model = model
+
+    async def open_session(self) -> STTSession:
+        import websockets
+
+        params = {"model": self.model, "punctuate": "true", "interim_results": "true"}
+        ws = await websockets.connect(
+            f"{self.url}?{urlencode(params)}",
+            extra_headers={"Authorization": f"Token {self.api_key}"},
+        )
+        return _DeepgramSession(ws)
+
+
+class _FakeSession(STTSession):
+    def __init__(self, delay: float):
+        self._delay = delay
+        self._queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+        self._words = []
+
+    async def send(self, chunk: bytes) -> None:
+        if self._delay:
+            await asyncio.sleep(self._delay)
+        self._words.extend(chunk.decode("utf-8", errors="ignore").split())
+        await self._queue.put({"text": " ".join(self._words), "is_final": False})
+
+    async def finish(self) -> None:
+        await self._queue.put({"text": " ".join(self._words), "is_final": True})
+        await self._queue.put(None)
+
+    async def results(self) -> AsyncIterator[Dict[str, Any]]:
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            yield item
+
+
+class FakeStreamingBackend(StreamingSTTBackend):
+    """
+    Offline stand-in for tests and load tests: every audio chunk is read as
+    UTF-8 text, each chunk produces an interim transcript of everything
+    received so far, and `finish` produces the final one.
+    """
+
+    name = "fake"
+
+    def __init__(self, delay_seconds: float = 0.0):
+        self.delay_seconds = delay_seconds
+
+    async def open_session(self) -> STTSession:
+        return _FakeSession(self.delay_seconds)
+
+
+def create_stt_backend() -> StreamingSTTBackend:
+    """Builds the backend selected by STT_BACKEND ("deepgram" by default, or "fake")."""
+    backend = os.getenv("STT_BACKEND", "deepgram").lower()
+    if backend == "fake":
+        return FakeStreamingBackend(delay_seconds=float(os.getenv("STT_FAKE_DELAY_SECONDS", "0")))
+    if backend == "deepgram":
+        return DeepgramStreamingBackend(
+            api_key=os.getenv("DEEPGRAM_API_KEY", ""),
+            url=os.getenv("DEEPGRAM_STREAMING_URL", "wss://api.deepgram.com/v1/listen"),
+        )
+    raise ValueError(f"Unknown STT_BACKEND '{backend}' (expected 'deepgram' or 'fake')")
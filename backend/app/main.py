@@ -1,8 +1,59 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.routes import router as api_router
+from app.api.routes import (
+    router as api_router,
+    predict_engine,
+    inference_executor,
+    chat_writer,
+    stt_http_client,
+    load_prediction_model,
+)
+from app.core.agent import agent_registry, memory_store
+from app.core.chat_history_db import ensure_indexes, ping as ping_mongo, close_client as close_mongo
+from app.core.db_pool import close_all_pools
+from app.core.tool import search_cache
+from app.core.startup import startup_tracker
+
+# Load the model, agent and MongoDB connection in the background so the API
+# starts serving (and answering /api/live) immediately; /api/ready reports
+# when they're done. Set to false to block startup until everything is loaded.
+STARTUP_BACKGROUND_LOADING = os.getenv("STARTUP_BACKGROUND_LOADING", "true").lower() == "true"
+
+async def _connect_mongo():
+    await ping_mongo()
+    # Make sure chat history reads are served from the (session_id, timestamp) index
+    await ensure_indexes()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: launch the prediction batching worker
+    await predict_engine.start()
+    # Start the write-behind chat history buffer
+    await chat_writer.start()
+    # Open the pooled client used for speech-to-text calls
+    await stt_http_client.start()
+    # Heavy components: the prediction model (required for readiness),
+    # the shared chat agent and MongoDB
+    await startup_tracker.load("model", load_prediction_model, background=STARTUP_BACKGROUND_LOADING)
+    await startup_tracker.load("agent", agent_registry.get, required=False, background=STARTUP_BACKGROUND_LOADING)
+    await startup_tracker.load("mongodb", _connect_mongo, required=False, background=STARTUP_BACKGROUND_LOADING)
+    yield
+    await startup_tracker.stop()
+    # Shutdown: stop the worker, fail any still-queued predictions and
+    # release the inference pool
+    await predict_engine.stop()
+    inference_executor.shutdown()
+    # Flush chat messages still waiting in the write-behind buffer
+    await chat_writer.stop()
+    await stt_http_client.aclose()
+    close_all_pools()
+    search_cache.save()
+    memory_store.close()
+    close_mongo()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS middleware
 origins = [
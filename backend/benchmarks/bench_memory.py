@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Compares per-message latency of the conversation memory backends.
+
+Each simulated chat turn does what run_agent does: load the session's
+window, append the user message, then append the assistant reply.
+
+    python benchmarks/bench_memory.py --sessions 200 --turns 20
+    python benchmarks/bench_memory.py --processes 4   # also run SQLite from 4 processes at once
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+# Make `app` importable when run from the backend/ directory or elsewhere
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from app.core.memory import InProcessMemoryBackend, SQLiteMemoryBackend, WindowMemoryManager
+
+
+def run_turns(manager, sessions, turns, message_chars, seed=42):
+    """Returns per-turn latencies in microseconds."""
+    rng = random.Random(seed)
+    text = "x" * message_chars
+    schedule = [f"sess-{rng.randrange(sessions)}" for _ in range(sessions * turns)]
+    latencies = []
+    for session_id in schedule:
+        start = time.perf_counter()
+        manager.load_conversation(session_id)
+        manager.save_user_message(session_id, text)
+        manager.save_assistant_message(session_id, text)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return latencies
+
+
+def summarize(name, latencies):
+    latencies = sorted(latencies)
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+    print(
+        f"{name:<22} turns={len(latencies):>6}  mean={statistics.mean(latencies):8.1f}us  "
+        f"p50={p(0.50):8.1f}us  p95={p(0.95):8.1f}us  p99={p(0.99):8.1f}us"
+    )
+
+
+def _sqlite_worker(args):
+    path, sessions, turns, message_chars, seed = args
+    manager = WindowMemoryManager(window_size=10, backend=SQLiteMemoryBackend(path=path))
+    return run_turns(manager, sessions, turns, message_chars, seed=seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=20, help="Chat turns per session")
+    parser.add_argument("--message-chars", type=int, default=400)
+    parser.add_argument("--processes", type=int, default=0, help="Also run SQLite from this many processes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inprocess = WindowMemoryManager(window_size=10, backend=InProcessMemoryBackend())
+        summarize("inprocess", run_turns(inprocess, args.sessions, args.turns, args.message_chars))
+
+        sqlite_path = os.path.join(tmp, "memory.sqlite3")
+        sqlite = WindowMemoryManager(window_size=10, backend=SQLiteMemoryBackend(path=sqlite_path))
+        summarize("sqlite (1 process)", run_turns(sqlite, args.sessions, args.turns, args.message_chars))
+        sqlite.close()
+
+        if args.processes > 0:
+            shared_path = os.path.join(tmp, "shared.sqlite3")
+            SQLiteMemoryBackend(path=shared_path).close()
+            jobs = [
+                (shared_path, args.sessions, args.turns, args.message_chars, seed)
+                for seed in range(args.processes)
+            ]
+            with Pool(args.processes) as pool:
+                results = pool.map(_sqlite_worker, jobs)
+            summarize(f"sqlite ({args.processes} processes)", [lat for res in results for lat in res])
+
+
+if __name__ == "__main__":
+    main()
@@ -15,5 +15,18 @@ CREATE TABLE IF NOT EXISTS appointments (
     appointment_time TIME NOT NULL,
     notes TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (patient_id) REFERENCES patients(id) ON DELETE CASCADE
+    FOREIGN KEY (patient_id) REFERENCES patients(id) ON DELETE CASCADE,
+    -- Appointments occupy one-hour blocks that may not overlap. Enforced by the
+    -- database at insert time, so concurrent bookings can't both take a slot.
+    -- The GiST index behind this constraint also serves availability lookups.
+    CONSTRAINT appointments_no_overlap EXCLUDE USING gist (
+        tsrange(
+            appointment_date + appointment_time,
+            appointment_date + appointment_time + INTERVAL '1 hour'
+        ) WITH &&
+    )
 );
+
+-- Indexes for slot lookups and per-patient queries
+CREATE INDEX IF NOT EXISTS idx_appointments_date_time ON appointments (appointment_date, appointment_time);
+CREATE INDEX IF NOT EXISTS idx_appointments_patient_id ON appointments (patient_id);
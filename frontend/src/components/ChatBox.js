@@ -86,8 +86,9 @@ const ChatBox = () => {
     setChatInput("");
     setIsLoading(true);
 
-    // Save user message to DB
-    await saveChatMessage("You", userMessage);
+    // Save user message to DB right away (in parallel with the chat request),
+    // so it is kept even if the page is closed before the reply arrives
+    const userMessageSaved = saveChatMessage("You", userMessage);
 
     try {
       // Send the message to the chat API
@@ -98,7 +99,8 @@ const ChatBox = () => {
       const botResponse = response.data.final_response || "No response";
       setMessages((prev) => [...prev, { sender: "Bot", text: botResponse }]);
 
-      // Save bot response to DB
+      // Save bot response to DB, after the user message so history stays in order
+      await userMessageSaved;
       await saveChatMessage("Bot", botResponse);
     } catch (error) {
       console.error("Error sending message:", error);
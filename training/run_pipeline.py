@@ -1,42 +1,223 @@
 #!/usr/bin/env python
+"""
+Runs the training pipeline: preprocess -> train -> export -> test.
+
+Each stage declares its inputs (data files, source code, hyperparameters
+read from the environment) and outputs. A stage is skipped when the
+fingerprint of its inputs matches the one recorded in the manifest and its
+outputs are still exactly what that run produced.
+
+    python run_pipeline.py                      # run whatever is out of date
+    python run_pipeline.py --stages test        # only (re)check the test stage
+    python run_pipeline.py --force train        # re-run train even if cached
+    python run_pipeline.py --force              # re-run every selected stage
+"""
+import argparse
+import hashlib
+import importlib
+import json
 import os
 import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+# Determine the project root (assumes run_pipeline.py is at the project root)
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+SRC_PATH = os.path.join(PROJECT_ROOT, 'src')
+MANIFEST_PATH = os.path.join(PROJECT_ROOT, '.pipeline_manifest.json')
+
+
+@dataclass
+class Stage:
+    name: str
+    module: str
+    inputs: List[str]
+    code: List[str]
+    outputs: List[str]
+    params: List[str] = field(default_factory=list)
+
+
+STAGES = [
+    Stage(
+        name='preprocess',
+        module='preprocess',
+        inputs=['data/TRAIN', 'data/TEST'],
+        code=['src/preprocess.py'],
+        outputs=[
+            'data/processed/X_train.npy', 'data/processed/y_train.npy',
+            'data/processed/X_val.npy', 'data/processed/y_val.npy',
+            'data/processed/X_test.npy', 'data/processed/y_test.npy',
+        ],
+    ),
+    Stage(
+        name='train',
+        module='train',
+        inputs=[
+            'data/processed/X_train.npy', 'data/processed/y_train.npy',
+            'data/processed/X_val.npy', 'data/processed/y_val.npy',
+        ],
+        code=['src/train.py', 'src/data_pipeline.py', 'src/feature_cache.py'],
+        outputs=[
+            'models/oral_disease_model.h5', 'models/oral_disease_saved_model',
+            'src/results/training_history.csv', 'src/results/training_history.png',
+        ],
+        params=[
+            'TRAIN_MODE', 'FEATURE_VIEWS', 'TRAIN_LEARNING_RATE', 'TRAIN_EPOCHS',
+            'TRAIN_BATCH_SIZE', 'DATA_SHUFFLE_BUFFER', 'DATA_CACHE_DIR', 'DATA_CACHED_SHUFFLE_BUFFER',
+        ],
+    ),
+    Stage(
+        name='export',
+        module='export',
+        inputs=['models/oral_disease_model.h5', 'data/processed/X_train.npy', 'data/processed/X_test.npy', 'data/processed/y_test.npy'],
+        code=['src/export.py', 'src/data_pipeline.py'],
+        outputs=['models/oral_disease_model_fp16.tflite', 'models/oral_disease_model_int8.tflite', 'src/results/export_report.csv'],
+        params=['EXPORT_ACCURACY_TOLERANCE', 'EXPORT_CALIBRATION_SAMPLES', 'EXPORT_LATENCY_SAMPLES'],
+    ),
+    Stage(
+        name='test',
+        module='test',
+        inputs=[
+            'models/oral_disease_model.h5', 'models/oral_disease_model_fp16.tflite',
+            'models/oral_disease_model_int8.tflite', 'data/processed/X_test.npy', 'data/processed/y_test.npy',
+        ],
+        code=['src/test.py', 'src/data_pipeline.py'],
+        outputs=[
+            'src/results/classification_report.txt', 'src/results/confusion_matrix.png',
+            'src/results/test_predictions_sample.png', 'src/results/latency_report.csv',
+        ],
+        params=['EVAL_BATCH_SIZE', 'EVAL_FORMATS'],
+    ),
+]
+STAGE_NAMES = [stage.name for stage in STAGES]
+
+
+class Manifest:
+    """
+    Records each stage's input fingerprint and output hashes in a JSON file.
+    File hashes are memoized by (size, mtime) so unchanged files, such as
+    the image dataset, aren't re-read on every run.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.data = {"file_hashes": {}, "stages": {}}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+
+    def file_hash(self, path):
+        st = os.stat(path)
+        rel = os.path.relpath(path, PROJECT_ROOT)
+        memo = self.data["file_hashes"].get(rel)
+        if memo and memo[0] == st.st_size and memo[1] == st.st_mtime_ns:
+            return memo[2]
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        self.data["file_hashes"][rel] = [st.st_size, st.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def path_hash(self, rel_path):
+        """Hash of a file, or of every file under a directory; None if missing."""
+        path = os.path.join(PROJECT_ROOT, rel_path)
+        if os.path.isfile(path):
+            return self.file_hash(path)
+        if not os.path.isdir(path):
+            return None
+        digest = hashlib.blake2b(digest_size=16)
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                digest.update(os.path.relpath(file_path, path).encode())
+                digest.update(self.file_hash(file_path).encode())
+        return digest.hexdigest()
+
+    def fingerprint(self, stage):
+        parts = {
+            "inputs": {p: self.path_hash(p) for p in stage.inputs},
+            "code": {p: self.path_hash(p) for p in stage.code},
+            "params": {name: os.getenv(name) for name in stage.params},
+        }
+        return hashlib.blake2b(json.dumps(parts, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+    def output_hashes(self, stage) -> Dict[str, str]:
+        return {p: self.path_hash(p) for p in stage.outputs}
+
+    def is_fresh(self, stage, fingerprint):
+        record = self.data["stages"].get(stage.name)
+        if not record or record["fingerprint"] != fingerprint:
+            return False
+        # Outputs must still be exactly what that run produced
+        return record["outputs"] == self.output_hashes(stage)
+
+    def record(self, stage, fingerprint, wall_seconds):
+        self.data["stages"][stage.name] = {
+            "fingerprint": fingerprint,
+            "outputs": self.output_hashes(stage),
+            "wall_seconds": round(wall_seconds, 1),
+            "completed_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        self.save()
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stages', nargs='+', choices=STAGE_NAMES, default=STAGE_NAMES,
+                        help='Stages to consider (always run in pipeline order)')
+    parser.add_argument('--force', nargs='*', choices=STAGE_NAMES, default=None,
+                        help='Re-run these stages even if cached (no names: all selected stages)')
+    return parser.parse_args()
+
 
 def main():
+    args = parse_args()
     print("Starting the pipeline...")
 
-    # Determine the project root (assumes run_pipeline.py is at the project root)
-    project_root = os.path.dirname(os.path.abspath(__file__))
-    src_path = os.path.join(project_root, 'src')
-
     # Ensure the src directory is in sys.path so that we can import modules from it
-    if src_path not in sys.path:
-        sys.path.insert(0, src_path)
-
-    # Import the main functions from each module
-    try:
-        from preprocess import main as preprocess_main
-        from train import main as train_main
-        from test import main as test_main
-    except ImportError as e:
-        print("Error importing modules from 'src'. Please ensure your module names and paths are correct.")
-        raise e
-
-    # Run data preprocessing
-    print("\n[1/3] Running data preprocessing...")
-    preprocess_main()
-    print("Data preprocessing completed.\n")
-
-    # Run model training
-    print("[2/3] Running model training...")
-    train_main()
-    print("Model training completed.\n")
-
-    # Run model testing/evaluation
-    print("[3/3] Running model testing...")
-    test_main()
-    print("Model testing completed.\n")
+    if SRC_PATH not in sys.path:
+        sys.path.insert(0, SRC_PATH)
+
+    selected = [stage for stage in STAGES if stage.name in args.stages]
+    forced = set(args.stages if args.force == [] else args.force or [])
+    manifest = Manifest(MANIFEST_PATH)
+    summary = []
+
+    for i, stage in enumerate(selected, start=1):
+        label = f"[{i}/{len(selected)}] {stage.name}"
+        fingerprint = manifest.fingerprint(stage)
+        if stage.name not in forced and manifest.is_fresh(stage, fingerprint):
+            print(f"{label}: cache hit ({fingerprint[:12]}), skipping.")
+            summary.append((stage.name, "cached", 0.0))
+            continue
+
+        print(f"\n{label}: running (fingerprint {fingerprint[:12]})...")
+        try:
+            # Imported lazily so fully cached runs don't load TensorFlow
+            stage_main = importlib.import_module(stage.module).main
+        except ImportError as e:
+            print("Error importing modules from 'src'. Please ensure your module names and paths are correct.")
+            raise e
+        started_at = time.perf_counter()
+        stage_main()
+        wall_seconds = time.perf_counter() - started_at
+        manifest.record(stage, fingerprint, wall_seconds)
+        print(f"{label}: completed in {wall_seconds:.1f}s.\n")
+        summary.append((stage.name, "ran", wall_seconds))
 
+    manifest.save()
+    print("Stage summary:")
+    for name, status, wall_seconds in summary:
+        print(f"  {name:<12} {status:<7} {wall_seconds:8.1f}s")
     print("Pipeline execution finished successfully.")
 
 if __name__ == '__main__':
@@ -0,0 +1,154 @@
+import os
+import time
+import numpy as np
+import tensorflow as tf
+
+# Images per batch for training and evaluation
+BATCH_SIZE = int(os.getenv("TRAIN_BATCH_SIZE", "16"))
+# Parallel map calls for normalization/augmentation ("autotune" lets tf.data decide)
+_parallel_calls = os.getenv("DATA_PARALLEL_CALLS", "autotune")
+NUM_PARALLEL_CALLS = tf.data.AUTOTUNE if _parallel_calls == "autotune" else int(_parallel_calls)
+# Shuffle buffer size in images (0 = the whole split). Without a cache only
+# indices are shuffled, so the whole split costs a few bytes per image
+SHUFFLE_BUFFER = int(os.getenv("DATA_SHUFFLE_BUFFER", "0"))
+# With a cache, decoded images themselves are shuffled, so the buffer is
+# capped at this many images (about 150 KB each at 224x224x3)
+CACHED_SHUFFLE_BUFFER = int(os.getenv("DATA_CACHED_SHUFFLE_BUFFER", "1024"))
+# Optional directory to cache each split's uint8 images to after the first
+# epoch; empty (default) reads every epoch straight from the .npy files
+CACHE_DIR = os.getenv("DATA_CACHE_DIR", "")
+
+
+def build_augmenter(seed=42):
+    """Random rotation, zoom, shift and horizontal flip, matching the old ImageDataGenerator settings."""
+    return tf.keras.Sequential([
+        tf.keras.layers.RandomRotation(5 / 360, fill_mode='nearest', seed=seed),
+        tf.keras.layers.RandomZoom(0.1, fill_mode='nearest', seed=seed),
+        tf.keras.layers.RandomTranslation(0.1, 0.1, fill_mode='nearest', seed=seed),
+        tf.keras.layers.RandomFlip('horizontal', seed=seed),
+    ], name='augmentation')
+
+
+def normalize(images):
+    return tf.cast(images, tf.float32) / 255.0
+
+
+def make_dataset(
+    X,
+    y=None,
+    num_classes=None,
+    training=False,
+    batch_size=BATCH_SIZE,
+    num_parallel_calls=NUM_PARALLEL_CALLS,
+    cache_name=None,
+    cache=None,
+    augment=None,
+    seed=42,
+):
+    """
+    Builds a tf.data pipeline over uint8 images (e.g. a memory-mapped .npy).
+    Only indices are shuffled and batched; each batch's rows are then read
+    from X in parallel map calls, so a memory-mapped split is never loaded
+    whole. Images stay uint8 until a batch is normalized to float32 on the fly.
+
+    :param y: Integer labels, one-hot encoded when `num_classes` is given.
+              Omit for prediction-only datasets.
+    :param training: Shuffle each epoch and apply random augmentation.
+    :param cache: Keep the uint8 images after the first pass: on disk under
+                  DATA_CACHE_DIR/`cache_name` when both are set, in memory
+                  otherwise. Defaults to caching only in the on-disk case;
+                  pass False for single-pass datasets.
+    :param augment: Override whether to augment (e.g. augmented views in a
+                    fixed order, without shuffling). Defaults to `training`.
+    """
+    n = len(X)
+    has_labels = y is not None
+    if has_labels:
+        y = np.asarray(y)
+    if augment is None:
+        augment = training
+    if cache is None:
+        cache = bool(CACHE_DIR and cache_name)
+
+    def read_rows(indices):
+        # Sorted so reads follow file order; a contiguous run is a plain slice
+        indices = np.sort(indices)
+        if indices[-1] - indices[0] + 1 == len(indices):
+            indices = slice(indices[0], indices[-1] + 1)
+        images = np.ascontiguousarray(X[indices])
+        return (images, y[indices]) if has_labels else images
+
+    def load(indices):
+        if has_labels:
+            images, labels = tf.numpy_function(read_rows, [indices], [tf.uint8, tf.as_dtype(y.dtype)])
+            labels.set_shape([None])
+        else:
+            images = tf.numpy_function(read_rows, [indices], tf.uint8)
+        images.set_shape((None,) + tuple(X.shape[1:]))
+        return (images, labels) if has_labels else images
+
+    ds = tf.data.Dataset.range(n)
+    if cache:
+        # Read once in file order, cache image by image, then shuffle images
+        # through a bounded buffer rather than one holding the whole split
+        ds = ds.batch(batch_size).map(load, num_parallel_calls=num_parallel_calls).unbatch()
+        ds = ds.apply(tf.data.experimental.assert_cardinality(n))
+        if CACHE_DIR and cache_name:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            ds = ds.cache(os.path.join(CACHE_DIR, cache_name))
+        else:
+            ds = ds.cache()
+        if training:
+            buffer_size = min(SHUFFLE_BUFFER or n, CACHED_SHUFFLE_BUFFER)
+            ds = ds.shuffle(buffer_size, seed=seed, reshuffle_each_iteration=True)
+        ds = ds.batch(batch_size)
+    else:
+        if training:
+            ds = ds.shuffle(SHUFFLE_BUFFER or n, seed=seed, reshuffle_each_iteration=True)
+        ds = ds.batch(batch_size).map(load, num_parallel_calls=num_parallel_calls)
+
+    if has_labels:
+        def prepare(images, labels):
+            if num_classes is not None:
+                labels = tf.one_hot(labels, num_classes)
+            return normalize(images), labels
+    else:
+        def prepare(images):
+            return normalize(images)
+    ds = ds.map(prepare, num_parallel_calls=num_parallel_calls)
+
+    if augment:
+        augmenter = build_augmenter(seed)
+        if has_labels:
+            ds = ds.map(
+                lambda images, labels: (augmenter(images, training=True), labels),
+                num_parallel_calls=num_parallel_calls,
+            )
+        else:
+            ds = ds.map(lambda images: augmenter(images, training=True), num_parallel_calls=num_parallel_calls)
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+
+class ThroughputCallback(tf.keras.callbacks.Callback):
+    """
+    Reports training throughput per epoch (excluding validation); also logged
+    as `images_per_sec` so it ends up in the training history.
+    """
+
+    def __init__(self, num_images):
+        super().__init__()
+        self.num_images = num_images
+        self._started_at = None
+        self._last_batch_at = None
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._started_at = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._last_batch_at = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        images_per_sec = self.num_images / max(self._last_batch_at - self._started_at, 1e-9)
+        if logs is not None:
+            logs['images_per_sec'] = images_per_sec
+        print(f"Epoch {epoch + 1}: {images_per_sec:.1f} images/sec")
@@ -0,0 +1,165 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from sklearn.metrics import accuracy_score
+from data_pipeline import make_dataset, normalize
+
+# Largest accuracy drop (in percentage points) a quantized variant may show
+# against the Keras model and still be recommended for serving.
+ACCURACY_TOLERANCE = float(os.getenv("EXPORT_ACCURACY_TOLERANCE", "1.0"))
+# Number of training images used to calibrate int8 activation ranges
+CALIBRATION_SAMPLES = int(os.getenv("EXPORT_CALIBRATION_SAMPLES", "200"))
+# Number of single-image inferences timed per variant
+LATENCY_SAMPLES = int(os.getenv("EXPORT_LATENCY_SAMPLES", "50"))
+
+
+def convert(model, variant, calibration_data=None):
+    """
+    Converts a Keras model to TFLite.
+    :param variant: "fp16" (float16 weights) or "int8" (weights and activations
+                    quantized to int8, calibrated on `calibration_data`; the
+                    model still takes and returns float32 so it is a drop-in).
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if variant == "fp16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif variant == "int8":
+        def representative_dataset():
+            for image in calibration_data:
+                yield [np.expand_dims(image, axis=0).astype(np.float32)]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    else:
+        raise ValueError(f"Unknown TFLite variant '{variant}'")
+    return converter.convert()
+
+
+def run_tflite(model_path, X, batch_size=32):
+    """Returns the softmax outputs of a TFLite model for every uint8 image in X."""
+    interpreter = tf.lite.Interpreter(model_path=model_path)
+    input_index = interpreter.get_input_details()[0]["index"]
+    output_index = interpreter.get_output_details()[0]["index"]
+    outputs = []
+    # Same tf.data pipeline as training and test.py
+    for batch in make_dataset(X, batch_size=batch_size, cache=False):
+        batch = batch.numpy()
+        interpreter.resize_tensor_input(input_index, batch.shape)
+        interpreter.allocate_tensors()
+        interpreter.set_tensor(input_index, batch)
+        interpreter.invoke()
+        outputs.append(interpreter.get_tensor(output_index))
+    return np.concatenate(outputs)
+
+
+def single_image_latency_ms(predict_one, X):
+    """Mean latency of predicting one image at a time, after one warmup call."""
+    samples = X[:LATENCY_SAMPLES]
+    predict_one(samples[:1])
+    start = time.perf_counter()
+    for i in range(len(samples)):
+        predict_one(samples[i:i + 1])
+    return (time.perf_counter() - start) * 1000 / len(samples)
+
+
+def tflite_single_predictor(model_path):
+    interpreter = tf.lite.Interpreter(model_path=model_path)
+    interpreter.allocate_tensors()
+    input_index = interpreter.get_input_details()[0]["index"]
+    output_index = interpreter.get_output_details()[0]["index"]
+
+    def predict_one(image):
+        interpreter.set_tensor(input_index, image)
+        interpreter.invoke()
+        return interpreter.get_tensor(output_index)
+
+    return predict_one
+
+
+def main():
+    # Set seeds for reproducibility
+    np.random.seed(42)
+    tf.random.set_seed(42)
+
+    # Define the project base directory (assumes this script is in src/)
+    BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+    # Define paths for data, results, and models
+    DATA_DIR = os.path.join(BASE_DIR, 'data')
+    PROCESSED_DIR = os.path.join(DATA_DIR, 'processed')
+    RESULTS_DIR = os.path.join(BASE_DIR, 'src', 'results')
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    MODELS_DIR = os.path.join(BASE_DIR, 'models')
+
+    # Load trained model
+    h5_model_path = os.path.join(MODELS_DIR, 'oral_disease_model.h5')
+    model = tf.keras.models.load_model(h5_model_path)
+    print("Loaded model from:", h5_model_path)
+
+    # Calibration images for int8 come from the training split
+    X_train = np.load(os.path.join(PROCESSED_DIR, 'X_train.npy'), mmap_mode='r')
+    calibration_idx = np.random.choice(len(X_train), min(CALIBRATION_SAMPLES, len(X_train)), replace=False)
+    calibration_data = normalize(X_train[np.sort(calibration_idx)]).numpy()
+
+    X_test = np.load(os.path.join(PROCESSED_DIR, 'X_test.npy'), mmap_mode='r')
+    y_test = np.load(os.path.join(PROCESSED_DIR, 'y_test.npy'))
+    print("X_test shape:", X_test.shape)
+    # Normalized images for the single-image latency measurements
+    latency_images = normalize(X_test[:LATENCY_SAMPLES]).numpy()
+
+    # Reference: the Keras model
+    keras_predictions = np.argmax(model.predict(make_dataset(X_test, cache=False), verbose=0), axis=1)
+    keras_accuracy = accuracy_score(y_test, keras_predictions) * 100
+    rows = [{
+        "variant": "keras",
+        "path": os.path.basename(h5_model_path),
+        "size_mb": round(os.path.getsize(h5_model_path) / 1e6, 2),
+        "accuracy": round(keras_accuracy, 2),
+        "accuracy_delta": 0.0,
+        "agreement_with_keras": 100.0,
+        "latency_ms": round(single_image_latency_ms(lambda x: model(x, training=False), latency_images), 2),
+    }]
+    print(f"Keras test accuracy: {keras_accuracy:.2f}%")
+
+    for variant in ("fp16", "int8"):
+        print(f"Converting to TFLite ({variant})...")
+        tflite_model = convert(model, variant, calibration_data)
+        tflite_path = os.path.join(MODELS_DIR, f'oral_disease_model_{variant}.tflite')
+        with open(tflite_path, 'wb') as f:
+            f.write(tflite_model)
+        print("TFLite model saved to:", tflite_path)
+
+        predictions = np.argmax(run_tflite(tflite_path, X_test), axis=1)
+        accuracy = accuracy_score(y_test, predictions) * 100
+        rows.append({
+            "variant": variant,
+            "path": os.path.basename(tflite_path),
+            "size_mb": round(os.path.getsize(tflite_path) / 1e6, 2),
+            "accuracy": round(accuracy, 2),
+            "accuracy_delta": round(accuracy - keras_accuracy, 2),
+            "agreement_with_keras": round(float(np.mean(predictions == keras_predictions)) * 100, 2),
+            "latency_ms": round(single_image_latency_ms(tflite_single_predictor(tflite_path), latency_images), 2),
+        })
+
+    report = pd.DataFrame(rows)
+    report_path = os.path.join(RESULTS_DIR, 'export_report.csv')
+    report.to_csv(report_path, index=False)
+    print(report.to_string(index=False))
+    print("Export report saved to:", report_path)
+
+    # Fastest TFLite variant that stays within tolerance of the Keras model
+    within = report[(report["variant"] != "keras") & (report["accuracy_delta"] >= -ACCURACY_TOLERANCE)]
+    if within.empty:
+        print(f"No TFLite variant is within {ACCURACY_TOLERANCE} points of the Keras model; keep serving Keras.")
+    else:
+        best = within.sort_values("latency_ms").iloc[0]
+        print(
+            f"Recommended: {best['path']} ({best['accuracy_delta']:+.2f} points, {best['latency_ms']} ms/image). "
+            f"Serve it with MODEL_RUNTIME=tflite MODEL_PATH=<path to {best['path']}>."
+        )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import hashlib
+import os
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import layers, Model
+from data_pipeline import make_dataset
+
+# Bytes hashed per read when fingerprinting a (memory-mapped) dataset
+_HASH_CHUNK = 64 * 1024 * 1024
+
+
+def array_hash(*arrays):
+    """Content hash of one or more arrays, read in chunks so memory-mapped input stays on disk."""
+    digest = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        digest.update(f"{array.dtype}{array.shape}".encode())
+        flat = np.ascontiguousarray(array).reshape(-1).view(np.uint8)
+        for start in range(0, flat.size, _HASH_CHUNK):
+            digest.update(flat[start:start + _HASH_CHUNK])
+    return digest.hexdigest()
+
+
+def backbone_hash(backbone):
+    """Hash of a backbone's architecture and weights."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(backbone.to_json().encode())
+    digest.update(array_hash(*backbone.get_weights()).encode())
+    return digest.hexdigest()
+
+
+def feature_extractor(backbone):
+    """Backbone followed by the same global average pooling the classifier uses."""
+    return Model(backbone.input, layers.GlobalAveragePooling2D()(backbone.output))
+
+
+def load_or_compute_features(backbone, X, cache_dir, name, views=0, seed=42):
+    """
+    Returns pooled backbone features for every image in X, shaped
+    (1 + views, N, features): view 0 is the plain images, the others are
+    randomly augmented copies.
+
+    Results are cached in `cache_dir` under a key built from the dataset
+    contents, the backbone weights and the number of views, so reruns
+    (e.g. hyperparameter sweeps) skip the backbone entirely.
+    """
+    key = hashlib.blake2b(
+        f"{array_hash(X)}:{backbone_hash(backbone)}:{views}:{seed}".encode(), digest_size=16
+    ).hexdigest()
+    path = os.path.join(cache_dir, f"{name}_{key}.npy")
+    if os.path.exists(path):
+        print("Loaded cached features from:", path)
+        return np.load(path, mmap_mode='r')
+
+    os.makedirs(cache_dir, exist_ok=True)
+    extractor = feature_extractor(backbone)
+    num_features = extractor.output.shape[-1]
+    tmp_path = f"{path}.tmp.npy"
+    features = np.lib.format.open_memmap(
+        tmp_path, mode='w+', dtype=np.float32, shape=(1 + views, len(X), num_features)
+    )
+    for view in range(1 + views):
+        print(f"Computing {name} features (view {view + 1}/{1 + views})...")
+        # Augmented views keep image order so row i always belongs to image i
+        tf.random.set_seed(seed + view)
+        ds = make_dataset(X, augment=view > 0, seed=seed + view, cache=False)
+        features[view] = extractor.predict(ds, verbose=0)
+    features.flush()
+    del features
+    # Only a complete file is ever visible under the cache key
+    os.replace(tmp_path, path)
+    print("Features cached at:", path)
+    return np.load(path, mmap_mode='r')
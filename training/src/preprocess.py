@@ -1,13 +1,92 @@
 import os
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image
 from sklearn.model_selection import train_test_split
-import tensorflow as tf
+
+# Define image size to match MobileNetV2 expected input (224x224)
+IMG_HEIGHT, IMG_WIDTH, channels = 224, 224, 3
+
+# Decoding runs in a process pool; each task handles this many images
+PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", str(os.cpu_count() or 1)))
+CHUNK_SIZE = int(os.getenv("PREPROCESS_CHUNK_SIZE", "64"))
+
+
+def list_images(root):
+    """Returns the sorted class names plus (path, label) for every image under root/<class>/."""
+    folders = sorted(os.listdir(root))
+    samples = []
+    for label, class_name in enumerate(folders):
+        class_folder = os.path.join(root, class_name)
+        for img_name in os.listdir(class_folder):
+            samples.append((os.path.join(class_folder, img_name), label))
+    return folders, samples
+
+
+def _decode_into(args):
+    """
+    Worker: decodes and resizes a chunk of images straight into rows of the
+    memory-mapped output, so pixels never travel back through the parent.
+    Returns (row, path, error) for every file that couldn't be read.
+    """
+    out_path, rows = args
+    out = np.load(out_path, mmap_mode='r+')
+    failed = []
+    for row, img_path in rows:
+        try:
+            image = Image.open(img_path).convert('RGB')
+            out[row] = np.asarray(image.resize((IMG_HEIGHT, IMG_WIDTH)))
+        except Exception as e:
+            # Unreadable or non-image file: report it instead of failing the whole split
+            failed.append((row, img_path, str(e)))
+    out.flush()
+    del out
+    return failed
+
+
+def _compact_rows(out_path, keep):
+    """Rewrites the .npy at `out_path` with only the rows in `keep`, chunk by chunk."""
+    src = np.load(out_path, mmap_mode='r')
+    tmp_path = f"{out_path}.tmp.npy"
+    dst = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=src.dtype, shape=(len(keep),) + src.shape[1:])
+    for start in range(0, len(keep), CHUNK_SIZE):
+        dst[start:start + CHUNK_SIZE] = src[keep[start:start + CHUNK_SIZE]]
+    dst.flush()
+    del dst, src
+    os.replace(tmp_path, out_path)
+
+
+def write_images(out_path, paths, labels, label_path, pool):
+    """
+    Preallocates `out_path` as an (N, H, W, 3) uint8 .npy file and fills it
+    in parallel, one chunk of rows per task. Labels are small and saved as is.
+    Images that fail to decode are reported and dropped (with their labels).
+    Returns the number of images written.
+    """
+    out = np.lib.format.open_memmap(
+        out_path, mode='w+', dtype=np.uint8, shape=(len(paths), IMG_HEIGHT, IMG_WIDTH, channels)
+    )
+    del out  # header written; workers reopen the file themselves
+    tasks = [
+        (out_path, list(zip(range(start, min(start + CHUNK_SIZE, len(paths))), paths[start:start + CHUNK_SIZE])))
+        for start in range(0, len(paths), CHUNK_SIZE)
+    ]
+    failed = sorted(f for chunk in pool.map(_decode_into, tasks) for f in chunk)
+    labels = np.asarray(labels)
+    if failed:
+        for _, img_path, error in failed:
+            print("Error reading:", img_path, f"({error})")
+        keep = np.setdiff1d(np.arange(len(paths)), [row for row, _, _ in failed])
+        _compact_rows(out_path, keep)
+        labels = labels[keep]
+    np.save(label_path, labels)
+    print(f"Wrote {len(labels)} images to:", out_path, f"(skipped {len(failed)} unreadable)" if failed else "")
+    return len(labels)
+
 
 def main():
     # Set seeds for reproducibility
     np.random.seed(42)
-    tf.random.set_seed(42)
 
     # Define the project base directory (assumes this script is in src/)
     BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -15,65 +94,48 @@ def main():
     # Define paths relative to the project root
     DATA_DIR = os.path.join(BASE_DIR, 'data')
     TRAIN_PATH = os.path.join(DATA_DIR, 'TRAIN')
-
-    # Define image size to match MobileNetV2 expected input (224x224)
-    IMG_HEIGHT, IMG_WIDTH, channels = 224, 224, 3
+    TEST_PATH = os.path.join(DATA_DIR, 'TEST')
 
     # Classes: assuming 'Caries' and 'Gingivitis'
-    folders = sorted(os.listdir(TRAIN_PATH))
+    folders, samples = list_images(TRAIN_PATH)
     NUM_CATEGORIES = len(folders)
     print("Found classes:", folders)
     print("Number of categories:", NUM_CATEGORIES)
+    print("Class to Label Mapping:", {class_name: idx for idx, class_name in enumerate(folders)})
+    print("Number of training images:", len(samples))
 
-    class_to_label = {class_name: idx for idx, class_name in enumerate(folders)}
-    print("Class to Label Mapping:", class_to_label)
-
-    # Load and preprocess training images
-    image_data = []
-    image_labels = []
-
-    for class_name in folders:
-        class_folder = os.path.join(TRAIN_PATH, class_name)
-        images = os.listdir(class_folder)
-        label = class_to_label[class_name]
+    paths = np.array([path for path, _ in samples])
+    image_labels = np.array([label for _, label in samples])
 
-        for img_name in images:
-            img_path = os.path.join(class_folder, img_name)
-            image = Image.open(img_path).convert('RGB')
-            image = image.resize((IMG_HEIGHT, IMG_WIDTH))
-            image_data.append(np.array(image))
-            image_labels.append(label)
-
-    image_data = np.array(image_data)
-    image_labels = np.array(image_labels)
-    print("Image data shape:", image_data.shape)
-    print("Image labels shape:", image_labels.shape)
-
-    # Shuffle and split data into train and validation sets
-    shuffle_indexes = np.arange(image_data.shape[0])
+    # Shuffle and split index arrays only; images are decoded straight into
+    # their final position in the train or validation file
+    shuffle_indexes = np.arange(len(samples))
     np.random.shuffle(shuffle_indexes)
-    image_data = image_data[shuffle_indexes]
-    image_labels = image_labels[shuffle_indexes]
-
-    X_train, X_val, y_train, y_val = train_test_split(
-        image_data, image_labels, test_size=0.2, random_state=42, shuffle=True
-    )
-
-    print("X_train.shape:", X_train.shape)
-    print("X_val.shape:", X_val.shape)
-    print("y_train.shape:", y_train.shape)
-    print("y_val.shape:", y_val.shape)
+    train_idx, val_idx = train_test_split(shuffle_indexes, test_size=0.2, random_state=42, shuffle=True)
 
     # Save processed data as .npy files for use in train.py
     # We'll save these files in a dedicated 'processed' folder inside data/
     PROCESSED_DIR = os.path.join(DATA_DIR, 'processed')
     os.makedirs(PROCESSED_DIR, exist_ok=True)
 
-    np.save(os.path.join(PROCESSED_DIR, 'X_train.npy'), X_train)
-    np.save(os.path.join(PROCESSED_DIR, 'X_val.npy'), X_val)
-    np.save(os.path.join(PROCESSED_DIR, 'y_train.npy'), y_train)
-    np.save(os.path.join(PROCESSED_DIR, 'y_val.npy'), y_val)
-
+    with ProcessPoolExecutor(max_workers=PREPROCESS_WORKERS) as pool:
+        num_train = write_images(
+            os.path.join(PROCESSED_DIR, 'X_train.npy'), list(paths[train_idx]), image_labels[train_idx],
+            os.path.join(PROCESSED_DIR, 'y_train.npy'), pool,
+        )
+        num_val = write_images(
+            os.path.join(PROCESSED_DIR, 'X_val.npy'), list(paths[val_idx]), image_labels[val_idx],
+            os.path.join(PROCESSED_DIR, 'y_val.npy'), pool,
+        )
+        # The TEST split is kept in folder order for test.py
+        _, test_samples = list_images(TEST_PATH)
+        write_images(
+            os.path.join(PROCESSED_DIR, 'X_test.npy'), [path for path, _ in test_samples],
+            [label for _, label in test_samples], os.path.join(PROCESSED_DIR, 'y_test.npy'), pool,
+        )
+
+    print("X_train.shape:", (num_train, IMG_HEIGHT, IMG_WIDTH, channels))
+    print("X_val.shape:", (num_val, IMG_HEIGHT, IMG_WIDTH, channels))
     print("Preprocessing done. Arrays saved in:", PROCESSED_DIR)
 
 if __name__ == '__main__':
@@ -1,11 +1,143 @@
 import os
+import sys
+import time
+import multiprocessing
 import numpy as np
-import cv2
-from PIL import Image
+import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import tensorflow as tf
-from sklearn.metrics import classification_report, accuracy_score, confusion_matrix
+from sklearn.metrics import classification_report
+from data_pipeline import make_dataset
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Images per inference call
+EVAL_BATCH_SIZE = int(os.getenv("EVAL_BATCH_SIZE", "32"))
+# Model formats to evaluate, in order; the first one found drives the plots and report
+EVAL_FORMATS = [f.strip() for f in os.getenv("EVAL_FORMATS", "keras,fp16,int8").split(",") if f.strip()]
+MODEL_FILES = {
+    "keras": "oral_disease_model.h5",
+    "fp16": "oral_disease_model_fp16.tflite",
+    "int8": "oral_disease_model_int8.tflite",
+}
+
+
+def load_predictor(model_format, model_path):
+    """
+    Returns (prepare, predict). `predict` maps a float32 image batch to class
+    probabilities; `prepare(shape)` must be called first for each batch shape
+    and does the untimed setup: resizing the TFLite input tensor, allocating
+    tensors and one warmup inference.
+    """
+    if model_format == "keras":
+        model = tf.keras.models.load_model(model_path)
+        resize = None
+
+        def predict(images):
+            return model(images, training=False).numpy()
+    else:
+        interpreter = tf.lite.Interpreter(model_path=model_path)
+        input_index = interpreter.get_input_details()[0]["index"]
+        output_index = interpreter.get_output_details()[0]["index"]
+
+        def resize(shape):
+            interpreter.resize_tensor_input(input_index, shape)
+            interpreter.allocate_tensors()
+
+        def predict(images):
+            interpreter.set_tensor(input_index, images)
+            interpreter.invoke()
+            return interpreter.get_tensor(output_index)
+
+    current_shape = [None]
+
+    def prepare(shape):
+        if current_shape[0] != shape:
+            if resize is not None:
+                resize(shape)
+            predict(np.zeros(shape, dtype=np.float32))
+            current_shape[0] = shape
+
+    return prepare, predict
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far, or None where unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS, kilobytes on Linux
+    return round(peak / 1e6 if sys.platform == "darwin" else peak / 1e3, 1)
+
+
+def percentiles(values, prefix):
+    values = np.asarray(values)
+    return {
+        f"{prefix}_p50": round(float(np.percentile(values, 50)), 2),
+        f"{prefix}_p95": round(float(np.percentile(values, 95)), 2),
+        f"{prefix}_p99": round(float(np.percentile(values, 99)), 2),
+        f"{prefix}_mean": round(float(values.mean()), 2),
+    }
+
+
+def evaluate_format(model_format, model_path, processed_dir, num_classes, batch_size):
+    """
+    Streams the TEST split through one model format batch by batch,
+    accumulating the confusion matrix and predicted labels as it goes.
+    Meant to run in its own process so its peak RSS is its own.
+    """
+    started_at = time.perf_counter()
+    prepare, predict = load_predictor(model_format, model_path)
+    load_ms = (time.perf_counter() - started_at) * 1000
+
+    X_test = np.load(os.path.join(processed_dir, 'X_test.npy'), mmap_mode='r')
+    y_test = np.load(os.path.join(processed_dir, 'y_test.npy'))
+
+    # Warm up once so graph tracing / tensor allocation isn't counted as latency
+    prepare((batch_size,) + X_test.shape[1:])
+
+    conf = np.zeros((num_classes, num_classes), dtype=np.int64)
+    predictions = np.empty(len(X_test), dtype=np.int64)
+    batch_ms = []
+    image_ms = []
+    offset = 0
+    # Normalization runs in parallel map calls; nothing is cached, so memory
+    # stays at a few batches whatever the size of the test set
+    for images in make_dataset(X_test, batch_size=batch_size, cache=False):
+        images = images.numpy()
+        # A smaller last batch needs its own resize and warmup, outside the timed region
+        prepare(images.shape)
+        start = time.perf_counter()
+        probabilities = predict(images)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        batch_ms.append(elapsed_ms)
+        image_ms.append(elapsed_ms / len(images))
+
+        batch_predictions = np.argmax(probabilities, axis=1)
+        labels = y_test[offset:offset + len(images)]
+        np.add.at(conf, (labels, batch_predictions), 1)
+        predictions[offset:offset + len(images)] = batch_predictions
+        offset += len(images)
+
+    return {
+        "format": model_format,
+        "conf": conf,
+        "predictions": predictions,
+        "summary": {
+            "format": model_format,
+            "accuracy": round(float(np.trace(conf)) / conf.sum() * 100, 2),
+            "batch_size": batch_size,
+            "load_ms": round(load_ms, 1),
+            **percentiles(batch_ms, "batch_ms"),
+            **percentiles(image_ms, "image_ms"),
+            "peak_rss_mb": peak_rss_mb(),
+        },
+    }
+
 
 def main():
     # Set seeds for reproducibility
@@ -18,6 +150,7 @@ def main():
     # Define paths for data, results, and models
     DATA_DIR = os.path.join(BASE_DIR, 'data')
     TEST_PATH = os.path.join(DATA_DIR, 'TEST')
+    PROCESSED_DIR = os.path.join(DATA_DIR, 'processed')
     RESULTS_DIR = os.path.join(BASE_DIR, 'src', 'results')
     os.makedirs(RESULTS_DIR, exist_ok=True)
     MODELS_DIR = os.path.join(BASE_DIR, 'models')
@@ -25,54 +158,44 @@ def main():
     # Assuming the same classes as in training
     folders = sorted(os.listdir(TEST_PATH))
     print("Test folders (Classes):", folders)
-    class_to_label = {class_name: idx for idx, class_name in enumerate(folders)}
-
-    # Load trained model
-    model_path = os.path.join(MODELS_DIR, 'oral_disease_model.h5')
-    model = tf.keras.models.load_model(model_path)
-    print("Loaded model from:", model_path)
-
-    # Get input shape from the model
-    IMG_HEIGHT, IMG_WIDTH = model.input.shape[1], model.input.shape[2]
-
-    test_data = []
-    test_labels = []
-
-    for class_name in folders:
-        class_dir = os.path.join(TEST_PATH, class_name)
-        label = class_to_label[class_name]
-        images = os.listdir(class_dir)
-
-        for img_name in images:
-            img_path = os.path.join(class_dir, img_name)
-            image = cv2.imread(img_path)
-            if image is None:
-                print("Error reading:", img_path)
-                continue
-
-            # Convert BGR to RGB and resize
-            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            image_fromarray = Image.fromarray(image, 'RGB')
-            resize_image = image_fromarray.resize((IMG_WIDTH, IMG_HEIGHT))
-            test_data.append(np.array(resize_image))
-            test_labels.append(label)
-
-    X_test = np.array(test_data, dtype='float32') / 255.0
-    y_test = np.array(test_labels)
-
-    print("X_test shape:", X_test.shape)
-    print("y_test shape:", y_test.shape)
 
-    # Predict using the trained model
-    pred_probabilities = model.predict(X_test, verbose=0)
-    predictions = np.argmax(pred_probabilities, axis=1)
+    # Each format is evaluated in a fresh process so peak RSS is comparable
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for model_format in EVAL_FORMATS:
+        model_path = os.path.join(MODELS_DIR, MODEL_FILES[model_format])
+        if not os.path.exists(model_path):
+            print(f"Skipping {model_format}: {model_path} not found")
+            continue
+        print(f"Evaluating {model_format} model from: {model_path}")
+        with ctx.Pool(1) as pool:
+            result = pool.apply(
+                evaluate_format, (model_format, model_path, PROCESSED_DIR, len(folders), EVAL_BATCH_SIZE)
+            )
+        print(f"{model_format}: accuracy {result['summary']['accuracy']}%, "
+              f"p95 {result['summary']['image_ms_p95']} ms/image, peak RSS {result['summary']['peak_rss_mb']} MB")
+        results.append(result)
+    if not results:
+        raise FileNotFoundError(f"No model found for formats {EVAL_FORMATS} in {MODELS_DIR}")
+
+    latency_report = pd.DataFrame([r["summary"] for r in results])
+    latency_report_path = os.path.join(RESULTS_DIR, 'latency_report.csv')
+    latency_report.to_csv(latency_report_path, index=False)
+    print(latency_report.to_string(index=False))
+    print("Latency report saved to:", latency_report_path)
+
+    # Accuracy, confusion matrix and report come from the first format evaluated
+    primary = results[0]
+    conf = primary["conf"]
+    predictions = primary["predictions"]
+    X_test = np.load(os.path.join(PROCESSED_DIR, 'X_test.npy'), mmap_mode='r')
+    y_test = np.load(os.path.join(PROCESSED_DIR, 'y_test.npy'))
 
     # Calculate test accuracy
-    test_accuracy = accuracy_score(y_test, predictions) * 100
-    print('Test Data Accuracy:', test_accuracy)
+    test_accuracy = np.trace(conf) / conf.sum() * 100
+    print(f'Test Data Accuracy ({primary["format"]}):', test_accuracy)
 
-    # Compute the confusion matrix
-    conf = confusion_matrix(y_test, predictions)
+    # Plot the confusion matrix
     plt.figure(figsize=(8, 6))
     sns.heatmap(conf, annot=True, fmt="d", cmap="Blues", xticklabels=folders, yticklabels=folders)
     plt.xlabel('Predicted Label', fontsize=12)
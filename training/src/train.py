@@ -3,14 +3,25 @@ import numpy as np
 import pandas as pd
 import tensorflow as tf
 from tensorflow.keras import layers, Model
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.applications import MobileNetV2
 from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
 from tensorflow.keras.utils import to_categorical
 import matplotlib.pyplot as plt
+from data_pipeline import BATCH_SIZE, ThroughputCallback, make_dataset
+from feature_cache import load_or_compute_features
+
+# "full" trains through the frozen backbone every epoch; "features" caches
+# the backbone's pooled features once and trains only the head on them
+TRAIN_MODE = os.getenv("TRAIN_MODE", "full").lower()
+# Augmented views per training image precomputed in "features" mode
+FEATURE_VIEWS = int(os.getenv("FEATURE_VIEWS", "4"))
+LEARNING_RATE = float(os.getenv("TRAIN_LEARNING_RATE", "0.001"))
+EPOCHS = int(os.getenv("TRAIN_EPOCHS", "30"))
 
 def main():
+    if TRAIN_MODE not in ('full', 'features'):
+        raise ValueError(f"Unknown TRAIN_MODE '{TRAIN_MODE}' (expected 'full' or 'features')")
     # Set seeds for reproducibility
     np.random.seed(42)
     tf.random.set_seed(42)
@@ -24,10 +35,11 @@ def main():
     PROCESSED_DIR = os.path.join(DATA_DIR, 'processed')
     RESULTS_DIR = os.path.join(BASE_DIR, 'src', 'results')
     os.makedirs(RESULTS_DIR, exist_ok=True)
+    FEATURE_CACHE_DIR = os.getenv("FEATURE_CACHE_DIR") or os.path.join(DATA_DIR, 'features')
 
-    # Load preprocessed data
-    X_train = np.load(os.path.join(PROCESSED_DIR, 'X_train.npy'))
-    X_val = np.load(os.path.join(PROCESSED_DIR, 'X_val.npy'))
+    # Load preprocessed data (memory-mapped, so pages are read on demand)
+    X_train = np.load(os.path.join(PROCESSED_DIR, 'X_train.npy'), mmap_mode='r')
+    X_val = np.load(os.path.join(PROCESSED_DIR, 'X_val.npy'), mmap_mode='r')
     y_train = np.load(os.path.join(PROCESSED_DIR, 'y_train.npy'))
     y_val = np.load(os.path.join(PROCESSED_DIR, 'y_val.npy'))
 
@@ -37,25 +49,13 @@ def main():
     print("y_train shape:", y_train.shape)
     print("y_val shape:", y_val.shape)
 
-    # Normalize pixel values
-    X_train = X_train.astype('float32') / 255.0
-    X_val = X_val.astype('float32') / 255.0
-
     NUM_CATEGORIES = len(np.unique(y_train))
     IMG_HEIGHT, IMG_WIDTH, channels = X_train.shape[1], X_train.shape[2], X_train.shape[3]
 
-    # One-hot encode labels
-    y_train = to_categorical(y_train, NUM_CATEGORIES)
-    y_val = to_categorical(y_val, NUM_CATEGORIES)
-
-    # Data augmentation
-    aug = ImageDataGenerator(
-        rotation_range=5,
-        zoom_range=0.1,
-        width_shift_range=0.1,
-        height_shift_range=0.1,
-        horizontal_flip=True
-    )
+    # tf.data pipelines: images stay uint8 and are normalized per batch,
+    # with augmentation running in parallel map calls
+    train_ds = make_dataset(X_train, y_train, NUM_CATEGORIES, training=True, cache_name='train')
+    val_ds = make_dataset(X_val, y_val, NUM_CATEGORIES, cache_name='val')
 
     # Use MobileNetV2 for transfer learning
     base_model = MobileNetV2(weights='imagenet', include_top=False, input_shape=(IMG_HEIGHT, IMG_WIDTH, channels))
@@ -64,21 +64,32 @@ def main():
     for layer in base_model.layers:
         layer.trainable = False
 
-    # Add custom classification layers
+    # Add custom classification layers. The layer objects are shared with the
+    # feature-mode head below, so both modes produce the same full model.
+    head_layers = [
+        layers.Dropout(0.5),
+        layers.Dense(128, activation='relu'),
+        layers.BatchNormalization(),
+        layers.Dropout(0.5),
+        layers.Dense(NUM_CATEGORIES, activation='softmax'),
+    ]
+
+    def apply_head(x):
+        for layer in head_layers:
+            x = layer(x)
+        return x
+
     x = base_model.output
     x = layers.GlobalAveragePooling2D()(x)
-    x = layers.Dropout(0.5)(x)
-    x = layers.Dense(128, activation='relu')(x)
-    x = layers.BatchNormalization()(x)
-    x = layers.Dropout(0.5)(x)
-    predictions = layers.Dense(NUM_CATEGORIES, activation='softmax')(x)
+    predictions = apply_head(x)
 
     model = Model(inputs=base_model.input, outputs=predictions)
 
     # Compile the model
-    lr = 0.001
-    opt = Adam(learning_rate=lr)
-    model.compile(loss='categorical_crossentropy', optimizer=opt, metrics=['accuracy'])
+    def compile_model(m):
+        m.compile(loss='categorical_crossentropy', optimizer=Adam(learning_rate=LEARNING_RATE), metrics=['accuracy'])
+
+    compile_model(model)
 
     model.summary()
 
@@ -86,16 +97,44 @@ def main():
     early_stop = EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True, verbose=1)
     reduce_lr = ReduceLROnPlateau(monitor='val_loss', factor=0.1, patience=3, verbose=1)
 
-    # Train the model
-    history = model.fit(
-        aug.flow(X_train, y_train, batch_size=16),
-        epochs=30,
-        validation_data=(X_val, y_val),
-        callbacks=[early_stop, reduce_lr]
-    )
+    print(f"Training mode: {TRAIN_MODE}, batch size: {BATCH_SIZE}, learning rate: {LEARNING_RATE}")
+    if TRAIN_MODE == 'features':
+        # The frozen backbone runs once per image (and augmented view); its
+        # pooled features are cached on disk and only the head is trained
+        train_features = load_or_compute_features(base_model, X_train, FEATURE_CACHE_DIR, 'train', views=FEATURE_VIEWS)
+        val_features = load_or_compute_features(base_model, X_val, FEATURE_CACHE_DIR, 'val')
+        num_features = train_features.shape[-1]
+
+        # Every view of every image is one training sample
+        X_train_features = np.asarray(train_features).reshape(-1, num_features)
+        y_train_features = to_categorical(np.tile(y_train, train_features.shape[0]), NUM_CATEGORIES)
+
+        feature_input = layers.Input(shape=(num_features,))
+        head = Model(inputs=feature_input, outputs=apply_head(feature_input))
+        compile_model(head)
+
+        history = head.fit(
+            X_train_features,
+            y_train_features,
+            batch_size=BATCH_SIZE,
+            epochs=EPOCHS,
+            shuffle=True,
+            validation_data=(np.asarray(val_features[0]), to_categorical(y_val, NUM_CATEGORIES)),
+            callbacks=[early_stop, reduce_lr, ThroughputCallback(len(X_train_features))]
+        )
+    else:
+        throughput = ThroughputCallback(len(X_train))
+
+        # Train the model
+        history = model.fit(
+            train_ds,
+            epochs=EPOCHS,
+            validation_data=val_ds,
+            callbacks=[early_stop, reduce_lr, throughput]
+        )
 
     # Evaluate the model on validation data
-    val_loss, val_accuracy = model.evaluate(X_val, y_val, verbose=0)
+    val_loss, val_accuracy = model.evaluate(val_ds, verbose=0)
     print("Validation Accuracy:", val_accuracy)
     print("Validation Loss:", val_loss)
 